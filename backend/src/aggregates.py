@@ -0,0 +1,118 @@
+"""
+Incrementally maintained per-document usage totals and top-K index for statistics
+"""
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from .database import get_collection
+from . import sync
+
+_lock = threading.Lock()
+_loaded = False
+_docs: Dict[str, Dict[str, Any]] = {}
+# Max-heap of (-total_usage, source_doc_id); stale entries are skipped lazily
+_heap: List[tuple] = []
+# Local changes not yet published to other workers
+_outbox: Counter = Counter()
+
+def _add_usage(doc_id: str, journal: Optional[str], delta: int, publish: bool = True):
+    if publish and sync.ENABLED:
+        _outbox[(doc_id, journal)] += delta
+    doc = _docs.get(doc_id)
+    if doc is None:
+        doc = _docs[doc_id] = {'journal': journal or 'Unknown', 'total_usage': 0}
+    doc['total_usage'] += delta
+    heapq.heappush(_heap, (-doc['total_usage'], doc_id))
+    if len(_heap) > 4 * len(_docs) + 64:
+        _compact()
+
+def _compact():
+    global _heap
+    _heap = [(-doc['total_usage'], doc_id) for doc_id, doc in _docs.items()]
+    heapq.heapify(_heap)
+
+def ensure_loaded(page_size: int = 5000):
+    """Build the aggregates from the collection once, paging through metadata"""
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        offset = 0
+        while True:
+            page = get_collection().get(include=["metadatas"], limit=page_size, offset=offset)
+            for metadata in page['metadatas']:
+                doc = _docs.setdefault(
+                    metadata['source_doc_id'],
+                    {'journal': metadata.get('journal', 'Unknown'), 'total_usage': 0}
+                )
+                doc['total_usage'] += metadata.get('usage_count', 0)
+            if len(page['ids']) < page_size:
+                break
+            offset += page_size
+        _compact()
+        _loaded = True
+
+def record_chunks(metadatas: Iterable[Dict[str, Any]]):
+    """Account for newly stored chunks and their initial usage counts"""
+    ensure_loaded()
+    with _lock:
+        for metadata in metadatas:
+            _add_usage(metadata['source_doc_id'], metadata.get('journal'), metadata.get('usage_count', 0))
+
+def record_replaced(old_metadatas: List[Dict[str, Any]], new_metadatas: List[Dict[str, Any]]):
+    """Move the usage of rewritten chunks from their old document to the new, so nothing is counted twice"""
+    ensure_loaded()
+    with _lock:
+        for old, new in zip(old_metadatas, new_metadatas):
+            # Rewrites keep the stored usage_count, which may have been flushed since it was read
+            usage = old.get('usage_count', 0)
+            if old['source_doc_id'] == new['source_doc_id'] and old.get('journal') == new.get('journal'):
+                continue
+            _add_usage(old['source_doc_id'], old.get('journal'), -usage)
+            _add_usage(new['source_doc_id'], new.get('journal'), usage)
+
+def record_usage(metadatas: Iterable[Dict[str, Any]]):
+    """Count one usage against the source document of each chunk"""
+    ensure_loaded()
+    with _lock:
+        for metadata in metadatas:
+            _add_usage(metadata['source_doc_id'], metadata.get('journal'), 1)
+
+def apply_deltas(deltas: Iterable[Tuple[str, Optional[str], int]]):
+    """Apply usage changes published by other workers"""
+    ensure_loaded()
+    with _lock:
+        for doc_id, journal, delta in deltas:
+            _add_usage(doc_id, journal, delta, publish=False)
+
+def drain_outbox() -> List[Tuple[str, Optional[str], int]]:
+    """Take the local changes that other workers have not seen yet"""
+    global _outbox
+    with _lock:
+        outbox, _outbox = _outbox, Counter()
+    return [(doc_id, journal, delta) for (doc_id, journal), delta in outbox.items() if delta]
+
+def top_documents(k: int = 10) -> List[Dict[str, Any]]:
+    """Documents with the highest total usage, without scanning the collection"""
+    ensure_loaded()
+    with _lock:
+        top, seen, valid = [], set(), []
+        while _heap and len(top) < k:
+            entry = heapq.heappop(_heap)
+            neg_total, doc_id = entry
+            doc = _docs.get(doc_id)
+            if doc_id in seen or doc is None or doc['total_usage'] != -neg_total:
+                continue
+            seen.add(doc_id)
+            valid.append(entry)
+            top.append({
+                "source_doc_id": doc_id,
+                "journal": doc['journal'],
+                "total_usage": doc['total_usage']
+            })
+        for entry in valid:
+            heapq.heappush(_heap, entry)
+        return top
@@ -0,0 +1,303 @@
+"""
+In-process BM25 inverted index over chunk text for lexical and hybrid retrieval
+"""
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+import numpy as np
+from .config import BM25_INDEX_PATH, BM25_SAVE_INTERVAL
+from .database import get_collection
+
+# Keeps dotted, slashed and hyphenated runs together so DOIs, species
+# abbreviations and chemical names match as single terms
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[./\-][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+def _top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n highest scores, best first"""
+    if n >= len(scores):
+        return np.argsort(-scores)
+    candidates = None
+    if len(scores) > 64 * n:
+        # A threshold from a strided sample usually leaves a few times n candidates;
+        # every score at or above it is kept, so the result is still exact
+        sample = scores[::len(scores) // (64 * n)]
+        rank = len(sample) - (4 * n * len(sample) // len(scores) + 1)
+        threshold = np.partition(sample, rank)[rank]
+        candidates = np.flatnonzero(scores >= threshold)
+        if len(candidates) < n:
+            candidates = None
+    if candidates is None:
+        candidates = np.argpartition(-scores, n)[:n]
+    elif len(candidates) > n:
+        candidates = candidates[np.argpartition(-scores[candidates], n)[:n]]
+    return candidates[np.argsort(-scores[candidates])]
+
+class BM25Index:
+    """Append-only postings with tombstones for replaced chunks"""
+
+    # Length norms are recomputed once the average length drifts this far from
+    # the one they were computed with
+    NORM_DRIFT = 0.02
+    # Terms whose postings save() copies per hold of the lock
+    SAVE_SLICE_TERMS = 4096
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        # Per-position arrays grown by doubling; a search keeps using the arrays
+        # it started with, so growth never invalidates a running search
+        self.lengths = np.zeros(0, dtype=np.uint32)
+        self.alive = np.zeros(0, dtype=np.uint8)
+        # k1 * (1 - b + b * length / avgdl), infinite for tombstones so they score zero
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.norm_avgdl = 0.0
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.total_length = 0
+        self.live_count = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def _reserve(self, rows: int):
+        if rows <= len(self.lengths):
+            return
+        size = max(rows, 2 * len(self.lengths), 1024)
+        count = len(self.ids)
+        grown = []
+        for current in (self.lengths, self.alive, self.norms):
+            resized = np.zeros(size, dtype=current.dtype)
+            resized[:count] = current[:count]
+            grown.append(resized)
+        self.lengths, self.alive, self.norms = grown
+
+    def _norm(self, lengths) -> np.ndarray:
+        return (self.k1 * (1 - self.b + self.b * np.asarray(lengths, dtype=np.float32) / self.norm_avgdl)).astype(np.float32)
+
+    def _refresh_norms(self):
+        """Recompute every norm if the average length moved; otherwise leave them as they are"""
+        if not self.live_count:
+            return
+        avgdl = self.total_length / self.live_count
+        if self.norm_avgdl and abs(avgdl - self.norm_avgdl) <= self.NORM_DRIFT * self.norm_avgdl:
+            return
+        count = len(self.ids)
+        self.norm_avgdl = avgdl
+        norms = np.zeros(len(self.lengths), dtype=np.float32)
+        norms[:count] = np.where(self.alive[:count] == 1, self._norm(self.lengths[:count]), np.inf)
+        # Replaced rather than updated in place so running searches see consistent values
+        self.norms = norms
+
+    def add(self, ids: List[str], texts: List[str]):
+        """Index chunk texts, replacing any earlier version of the same ids"""
+        tokenized = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            self._reserve(len(self.ids) + len(tokenized))
+            first = len(self.ids)
+            for chunk_id, terms in zip(ids, tokenized):
+                old = self.positions.get(chunk_id)
+                if old is not None and self.alive[old]:
+                    self.alive[old] = 0
+                    self.norms[old] = np.inf
+                    self.total_length -= int(self.lengths[old])
+                    self.live_count -= 1
+
+                position = len(self.ids)
+                length = sum(terms.values())
+                self.ids.append(chunk_id)
+                self.positions[chunk_id] = position
+                self.lengths[position] = length
+                self.alive[position] = 1
+                self.total_length += length
+                self.live_count += 1
+
+                for term, tf in terms.items():
+                    docs, tfs = self.postings.setdefault(term, (array('I'), array('H')))
+                    docs.append(position)
+                    tfs.append(min(tf, 65535))
+
+            if self.norm_avgdl:
+                # A chunk repeated within the batch has already tombstoned its earlier row
+                added = slice(first, len(self.ids))
+                self.norms[added] = np.where(self.alive[added] == 1, self._norm(self.lengths[added]), np.inf)
+            self._refresh_norms()
+            self.dirty = True
+
+    def _snapshot(self, terms: List[str]):
+        """Copy what a search needs so scoring can run without the lock"""
+        with self._lock:
+            postings = [
+                (self.postings[term][0].tobytes(), self.postings[term][1].tobytes())
+                for term in terms if term in self.postings
+            ]
+            return postings, self.norms, self.live_count
+
+    def search(self, query: str, n: int) -> List[Tuple[str, float]]:
+        """Top n (chunk_id, score) pairs with a positive BM25 score"""
+        terms = list(set(tokenize(query)))
+        if not terms:
+            return []
+        postings, norms, live_count = self._snapshot(terms)
+        if not postings or not live_count:
+            return []
+
+        # Only the query terms' postings are scored; tombstones have an infinite norm
+        term_scores = []
+        for doc_bytes, tf_bytes in postings:
+            docs = np.frombuffer(doc_bytes, dtype=np.uint32)
+            tfs = np.frombuffer(tf_bytes, dtype=np.uint16).astype(np.float32)
+            norm = norms.take(docs)
+            df = len(docs) - int(np.count_nonzero(np.isinf(norm)))
+            if not df:
+                continue
+            idf = math.log(1 + (live_count - df + 0.5) / (df + 0.5))
+            scores = tfs + norm
+            np.divide(tfs, scores, out=scores)
+            scores *= idf * (self.k1 + 1)
+            term_scores.append((docs, scores))
+        if not term_scores:
+            return []
+
+        if len(term_scores) == 1:
+            docs, scores = term_scores[0]
+        else:
+            # Accumulate per position; positions outside every posting stay zero
+            scores = np.zeros(len(norms), dtype=np.float32)
+            for term_docs, term_score in term_scores:
+                np.add.at(scores, term_docs, term_score)
+            docs = None
+
+        ids = self.ids
+        results = []
+        for i in _top_n(scores, n):
+            if scores[i] <= 0:
+                break
+            results.append((ids[i if docs is None else docs[i]], float(scores[i])))
+        return results
+
+    def save(self, path: str):
+        # A consistent cut is the first `count` positions; postings only ever grow
+        # at the tail, so they are copied a slice of terms at a time and trimmed
+        # back to it, keeping add() and searches from waiting on the whole copy
+        with self._lock:
+            count = len(self.ids)
+            state = {
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self.ids[:count],
+                "lengths": self.lengths[:count].tobytes(),
+                "alive": self.alive[:count].tobytes(),
+                "postings": {},
+                "total_length": self.total_length,
+                "live_count": self.live_count
+            }
+            terms = list(self.postings)
+            self.dirty = False
+        for start in range(0, len(terms), self.SAVE_SLICE_TERMS):
+            with self._lock:
+                copied = [
+                    (term, self.postings[term][0].tobytes(), self.postings[term][1].tobytes())
+                    for term in terms[start:start + self.SAVE_SLICE_TERMS]
+                ]
+            for term, doc_bytes, tf_bytes in copied:
+                docs = np.frombuffer(doc_bytes, dtype=np.uint32)
+                if len(docs) and docs[-1] >= count:
+                    kept = int(np.searchsorted(docs, count))
+                    doc_bytes = doc_bytes[:kept * docs.itemsize]
+                    tf_bytes = tf_bytes[:kept * 2]
+                state["postings"][term] = (doc_bytes, tf_bytes)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = cls(state["k1"], state["b"])
+        index.ids = state["ids"]
+        index.lengths = np.frombuffer(state["lengths"], dtype=np.uint32).copy()
+        index.alive = np.frombuffer(state["alive"], dtype=np.uint8).copy()
+        for term, (docs, tfs) in state["postings"].items():
+            posting = (array('I'), array('H'))
+            posting[0].frombytes(docs)
+            posting[1].frombytes(tfs)
+            index.postings[term] = posting
+        index.total_length = state["total_length"]
+        index.live_count = state["live_count"]
+        index.norms = np.zeros(len(index.ids), dtype=np.float32)
+        index._refresh_norms()
+        # Later duplicates win, matching the order chunks were added in
+        for i, chunk_id in enumerate(index.ids):
+            if index.alive[i]:
+                index.positions[chunk_id] = i
+        return index
+
+bm25_index = BM25Index()
+_load_lock = threading.Lock()
+_loaded = False
+_stop = threading.Event()
+
+def ensure_loaded(page_size: int = 1000):
+    """Load the index from disk, rebuilding it from the collection if it is missing or stale"""
+    global bm25_index, _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if _loaded:
+            return
+        if os.path.exists(BM25_INDEX_PATH):
+            try:
+                bm25_index = BM25Index.load(BM25_INDEX_PATH)
+            except Exception as e:
+                print(f"BM25 index load failed, rebuilding: {e}")
+
+        if bm25_index.live_count != get_collection().count():
+            bm25_index = BM25Index()
+            offset = 0
+            while True:
+                page = get_collection().get(include=["documents"], limit=page_size, offset=offset)
+                bm25_index.add(page['ids'], page['documents'])
+                if len(page['ids']) < page_size:
+                    break
+                offset += page_size
+            save()
+
+        threading.Thread(target=_run_saver, name="bm25-saver", daemon=True).start()
+        _loaded = True
+
+def add(ids: List[str], texts: List[str]):
+    """Index newly written chunks"""
+    ensure_loaded()
+    bm25_index.add(ids, texts)
+
+def search(query: str, n: int) -> List[Tuple[str, float]]:
+    ensure_loaded()
+    return bm25_index.search(query, n)
+
+def save():
+    """Persist the index if it changed since the last save"""
+    if bm25_index.dirty:
+        bm25_index.save(BM25_INDEX_PATH)
+
+def _run_saver():
+    while not _stop.wait(BM25_SAVE_INTERVAL):
+        try:
+            save()
+        except Exception as e:
+            print(f"BM25 index save failed: {e}")
+
+def stop():
+    """Stop the background saver and write out pending changes"""
+    _stop.set()
+    if _loaded:
+        save()
@@ -0,0 +1,208 @@
+"""
+Offline bulk indexer: embed JSON/NDJSON chunk files with a process pool and write straight to the store
+
+    python -m src.bulk_index data/corpus.ndjson --processes 4 --resume
+
+Stop the API server first, even when both use a Chroma server through CHROMA_HOST:
+a running server would not see the bulk writes in its BM25 index, result cache,
+usage aggregates or quantized tier, and both would write the same index files.
+The indexer refuses to start while a server on this host uses the same data directory.
+Unchanged chunks are skipped by content hash, and --resume also skips the
+records a checkpoint says were already written.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from .config import CHROMA_DB_PATH
+from .models import ChunkData
+from .database import get_chroma_client
+from .embeddings import get_provider, SentenceTransformerProvider
+from .ingest import iter_batches, plan_batch, write_batch
+from .json_stream import iter_json_array
+from . import bm25, sync
+
+DEFAULT_CHECKPOINT = os.path.join(CHROMA_DB_PATH, "bulk_index_checkpoint.json")
+
+def iter_records(path: str, skip: int = 0) -> Iterator[Tuple[int, Optional[ChunkData], Optional[str]]]:
+    """(record number, chunk, error) for each record after the first `skip`"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            lines = (line for line in f if line.strip())
+            for number, line in enumerate(lines, 1):
+                if number <= skip:
+                    continue
+                try:
+                    yield number, ChunkData.model_validate_json(line), None
+                except ValidationError as e:
+                    yield number, None, e.errors()[0]['msg']
+        else:
+            for number, item in enumerate(iter_json_array(f, read_size=1 << 20), 1):
+                if number <= skip:
+                    continue
+                try:
+                    yield number, ChunkData.model_validate(item), None
+                except ValidationError as e:
+                    yield number, None, e.errors()[0]['msg']
+
+class Checkpoint:
+    """Records written per input file, saved atomically after every batch"""
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.done: Dict[str, int] = {}
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                self.done = json.load(f)
+
+    def get(self, source: str) -> int:
+        return self.done.get(os.path.abspath(source), 0)
+
+    def save(self, source: str, records: int):
+        self.done[os.path.abspath(source)] = records
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.done, f)
+        os.replace(tmp_path, self.path)
+
+# Per-process model for pool workers
+_worker_provider = None
+
+def _init_worker(model: str, threads: int):
+    global _worker_provider
+    import torch
+    torch.set_num_threads(threads)
+    _worker_provider = get_provider(model)
+    _worker_provider.get_model()
+
+def _encode(texts: List[str]) -> List[List[float]]:
+    return _worker_provider.encode(texts)
+
+class Embedder:
+    """Splits texts across a process pool for local models; remote models embed in-process"""
+
+    def __init__(self, model: str, processes: int, batch_size: int):
+        self.provider = get_provider(model)
+        self.batch_size = batch_size
+        self.pool = None
+        if processes > 1 and isinstance(self.provider, SentenceTransformerProvider):
+            threads = max(1, (os.cpu_count() or processes) // processes)
+            context = multiprocessing.get_context("spawn")
+            # Unlike multiprocessing.Pool, the executor breaks instead of respawning
+            # workers forever when the initializer fails, e.g. on a bad model name
+            self.pool = ProcessPoolExecutor(
+                processes, mp_context=context, initializer=_init_worker, initargs=(self.provider.name, threads)
+            )
+
+    def submit(self, texts: List[str]):
+        """Start embedding; call .get() on the result for the vectors in order"""
+        pieces = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.pool is not None:
+            return _Pooled([self.pool.submit(_encode, piece) for piece in pieces])
+        return _Done([self.provider.encode(piece) for piece in pieces])
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+class _Pooled:
+    def __init__(self, futures):
+        self.futures = futures
+
+    def get(self):
+        return [future.result() for future in self.futures]
+
+class _Done:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+def index_file(path: str, args: argparse.Namespace, embedder: Embedder, checkpoint: Checkpoint) -> Dict[str, int]:
+    totals = {"inserted": 0, "updated": 0, "skipped": 0, "invalid": 0}
+    skip = checkpoint.get(path)
+    if skip:
+        print(f"{path}: resuming after record {skip}")
+
+    def valid_chunks(records):
+        for number, chunk, error in records:
+            last_record[0] = number
+            if chunk is None:
+                totals["invalid"] += 1
+                if totals["invalid"] <= 10:
+                    print(f"  record {number}: {error}")
+                continue
+            yield chunk
+
+    last_record = [skip]
+    start = time.perf_counter()
+    pending = None
+
+    def finish(batch_plan, embedding_job, records_done):
+        embeddings = [vector for piece in embedding_job.get() for vector in piece]
+        counts = write_batch(batch_plan, embeddings, embedder.provider.name, update_aggregates=False)
+        for key, value in counts.items():
+            totals[key] += value
+        checkpoint.save(path, records_done)
+        processed = sum(totals.values())
+        print(
+            f"  {records_done} records: {totals['inserted']} inserted, {totals['updated']} updated, "
+            f"{totals['skipped']} unchanged ({processed / (time.perf_counter() - start):.0f}/s)"
+        )
+
+    # Batch N+1 is read, planned and sent to the pool while batch N is written
+    for batch in iter_batches(valid_chunks(iter_records(path, skip)), args.batch_size):
+        batch_plan = plan_batch(batch, embedder.provider.name, pending=pending[0] if pending else None)
+        job = embedder.submit([chunk.text for chunk in batch_plan.to_embed])
+        if pending is not None:
+            finish(*pending)
+        pending = (batch_plan, job, last_record[0])
+    if pending is not None:
+        finish(*pending)
+    checkpoint.save(path, last_record[0])
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Index chunk files directly into the vector store")
+    parser.add_argument("files", nargs="+", help="JSON array or .ndjson/.jsonl files of ChunkData records")
+    parser.add_argument("--model", help="Embedding model (defaults to the server default)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Embedding worker processes")
+    parser.add_argument("--batch-size", type=int, default=4096, help="Chunks per store write")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Texts per worker task")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--resume", action="store_true", help="Skip records the checkpoint marks as written")
+    args = parser.parse_args()
+    if sync.server_running():
+        parser.error("the API server is running against this data directory; stop it first")
+
+    max_batch = getattr(get_chroma_client(), "max_batch_size", None)
+    if max_batch and args.batch_size > max_batch:
+        print(f"Limiting --batch-size to the store's maximum of {max_batch}")
+        args.batch_size = max_batch
+
+    model = get_provider(args.model).name
+    embedder = Embedder(model, args.processes, args.embed_batch_size)
+    checkpoint = Checkpoint(args.checkpoint, args.resume)
+    print(f"Indexing {len(args.files)} file(s) with {model}, {args.processes} process(es)")
+
+    started = time.perf_counter()
+    try:
+        for path in args.files:
+            totals = index_file(path, args, embedder, checkpoint)
+            print(f"{path}: {totals}")
+    except BrokenProcessPool:
+        raise SystemExit("Embedding workers failed to start or died; see their errors above")
+    finally:
+        embedder.close()
+        # Persist the BM25 index so the server does not rebuild it at startup
+        bm25.stop()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,86 @@ HOST = os.getenv("HOST", "0.0.0.0")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+# Set CHROMA_HOST to use a Chroma server instead of opening CHROMA_DB_PATH in-process
+CHROMA_HOST = os.getenv("CHROMA_HOST", "")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8001))
+# Uvicorn worker processes; more than one requires CHROMA_HOST
+WORKERS = int(os.getenv("WORKERS", 1))
+SYNC_DB_PATH = os.getenv("SYNC_DB_PATH", os.path.join(CHROMA_DB_PATH, "worker_sync.sqlite3"))
+SYNC_INTERVAL = float(os.getenv("SYNC_INTERVAL", 2.0))
+SYNC_EVENT_RETENTION = float(os.getenv("SYNC_EVENT_RETENTION", 3600))
+METADATA_INDEX_PATH = os.getenv(
+    "METADATA_INDEX_PATH", os.path.join(CHROMA_DB_PATH, "metadata_index.sqlite3")
+)
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", os.path.join(CHROMA_DB_PATH, "bm25_index.pkl"))
+# Each save re-serializes the whole index, so its cost grows with the corpus;
+# postings are copied in slices, so ingest and searches only wait briefly
+BM25_SAVE_INTERVAL = float(os.getenv("BM25_SAVE_INTERVAL", 30.0))
+QUANTIZED_INDEX_PATH = os.getenv("QUANTIZED_INDEX_PATH", os.path.join(CHROMA_DB_PATH, "quantized_index"))
+# Serve unfiltered default-model vector searches from the int8 tier once it is built
+QUANTIZED_SEARCH = os.getenv("QUANTIZED_SEARCH", "false").lower() == "true"
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR", 8))
+# Seconds a stale tier waits for writes to settle before it is rebuilt in the background
+QUANTIZED_REBUILD_DELAY = float(os.getenv("QUANTIZED_REBUILD_DELAY", 60.0))
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "") # Optional
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+OPENAI_EMBEDDING_DIMENSIONS = int(os.getenv("OPENAI_EMBEDDING_DIMENSIONS", 0)) # Only for mock/unknown models; known models keep their size
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "") # e.g. a local mock server
+OPENAI_BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE", 256)) # Inputs per API request
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 6))
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 3000)) # 0 = unthrottled
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 1000000)) # 0 = unthrottled
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 30.0))
+
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Additional local models selectable per request, comma-separated
+LOCAL_EMBEDDING_MODELS = [LOCAL_EMBEDDING_MODEL] + [
+    name.strip() for name in os.getenv("EXTRA_LOCAL_EMBEDDING_MODELS", "").split(",")
+    if name.strip() and name.strip() != LOCAL_EMBEDDING_MODEL
+]
+# Default model for requests that do not select one; empty = OpenAI when configured, else local
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "research_papers")
+PRELOAD_EMBEDDING_MODEL = os.getenv("PRELOAD_EMBEDDING_MODEL", "true").lower() == "true"
+# Embedded and searched once at startup before reporting ready; empty skips the warm-up
+WARMUP_QUERY = os.getenv("WARMUP_QUERY", "effects of temperature on crop yield")
+# Startup steps are retried with backoff this many times before liveness reports failure
+STARTUP_RETRIES = int(os.getenv("STARTUP_RETRIES", 5))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", 256))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", 1024 * 1024))
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", 86400))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "") # Optional on-disk tier
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", 200000)) # Max rows in the on-disk tier
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 2048))
+
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("HYBRID_CANDIDATE_FACTOR", 4))
+RRF_K = int(os.getenv("RRF_K", 60))
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 16))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 150))
+
+JOURNAL_STREAM_PAGE_SIZE = int(os.getenv("JOURNAL_STREAM_PAGE_SIZE", 200))
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 16))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", 1000))
+
+WORK_POOL_SIZE = int(os.getenv("WORK_POOL_SIZE", os.cpu_count() or 4))
+WORK_MAX_CONCURRENCY = int(os.getenv("WORK_MAX_CONCURRENCY", WORK_POOL_SIZE * 2))
+
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", 5.0))
 
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+
+# Stage histograms for /metrics; with both flags off no timing code runs
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Answer requests carrying X-Request-Timings with a Server-Timing header
+REQUEST_TIMINGS_ENABLED = os.getenv("REQUEST_TIMINGS_ENABLED", str(DEBUG)).lower() == "true"
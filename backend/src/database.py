@@ -1,20 +1,82 @@
 """
 Database connection and operations for ChromaDB
 """
-import chromadb
-from chromadb.config import Settings
-from .config import CHROMA_DB_PATH
+import hashlib
+import itertools
+import re
+import threading
+from typing import Dict, Any, Optional
+from .config import CHROMA_DB_PATH, CHROMA_HOST, CHROMA_PORT, COLLECTION_NAME
+from .embeddings import get_provider
+
+_client = None
+_collections: Dict[str, Any] = {}
+_lock = threading.Lock()
+_client_lock = threading.Lock()
 
 def get_chroma_client():
-    """Get ChromaDB client"""
-    return chromadb.PersistentClient(path=CHROMA_DB_PATH)
-
-def get_collection():
-    """Get or create the research papers collection"""
-    client = get_chroma_client()
-    return client.get_or_create_collection(
-        name="research_papers",
-        metadata={"hnsw:space": "cosine"}
-    )
-
-collection = get_collection()
+    """Get the process-wide ChromaDB client, importing chromadb on first use.
+
+    An embedded PersistentClient must not be shared by several processes;
+    multi-worker deployments point CHROMA_HOST at a Chroma server instead.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import chromadb
+                if CHROMA_HOST:
+                    _client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+                else:
+                    _client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    return _client
+
+# Chroma collection names are at most 63 characters and must end alphanumerically
+MAX_COLLECTION_NAME = 63
+
+def collection_name_for(model: str) -> str:
+    """Each embedding model gets its own collection so vector dimensions never mix"""
+    slug = re.sub(r"[^a-zA-Z0-9_-]+", "-", model).strip("-_")
+    name = f"{COLLECTION_NAME}__{slug}"
+    if len(name) <= MAX_COLLECTION_NAME:
+        return name
+    # Long names keep a readable prefix plus a hash of the full model name, so they stay distinct
+    digest = hashlib.sha1(model.encode("utf-8")).hexdigest()[:8]
+    prefix = name[:MAX_COLLECTION_NAME - len(digest) - 1].rstrip("-_")
+    return f"{prefix}-{digest}"
+
+def get_collection(model: Optional[str] = None):
+    """Get or create the research papers collection for an embedding model"""
+    provider = get_provider(model)
+    collection = _collections.get(provider.name)
+    if collection is not None:
+        return collection
+
+    with _lock:
+        if provider.name not in _collections:
+            collection = get_chroma_client().get_or_create_collection(
+                name=collection_name_for(provider.name),
+                metadata={
+                    "hnsw:space": "cosine",
+                    "embedding_model": provider.name,
+                    "dimensions": provider.dimensions
+                }
+            )
+            stored = (collection.metadata or {}).get("dimensions")
+            if stored is not None and stored != provider.dimensions:
+                raise ValueError(
+                    f"Collection {collection.name} holds {stored}-d vectors "
+                    f"but {provider.name} produces {provider.dimensions}-d"
+                )
+            _collections[provider.name] = collection
+    return _collections[provider.name]
+
+# Bumped on every content write so cached search results can be invalidated
+_generation = itertools.count(1)
+collection_generation = 0
+
+def bump_generation() -> int:
+    """Mark the collection contents as changed"""
+    global collection_generation
+    collection_generation = next(_generation)
+    return collection_generation
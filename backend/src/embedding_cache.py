@@ -0,0 +1,128 @@
+"""
+Bounded LRU/TTL cache of embeddings keyed by normalized text and model, with an optional SQLite tier
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from .config import EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_DISK_SIZE
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return " ".join(text.split())
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """In-memory LRU with per-entry TTL, backed by an optional on-disk table"""
+
+    def __init__(self, max_size: int, ttl: float, path: Optional[str] = None, max_disk_size: int = 0):
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite I/O has its own lock so disk lookups do not block memory hits
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._disk_rows = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, created REAL, vector BLOB)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_created ON embeddings (created)")
+            self._db.commit()
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._prune_disk()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and time.time() - created > self.ttl
+
+    def _get_disk(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT created, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or self._expired(row[0]):
+            return None
+        return row[0], array('f', row[1]).tolist()
+
+    def _prune_disk(self):
+        """Drop expired rows, then the oldest rows beyond max_disk_size"""
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM embeddings WHERE created < ?", (time.time() - self.ttl,))
+        if self.max_disk_size > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_size,)
+            )
+        self._db.commit()
+        self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+        entry = self._get_disk(key) if self._db is not None else None
+        with self._lock:
+            if entry is not None:
+                self._store(key, entry)
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def put_many(self, items: Dict[str, List[float]]):
+        now = time.time()
+        with self._lock:
+            for key, vector in items.items():
+                self._store(key, (now, vector))
+        if self._db is not None:
+            rows = [(key, now, array('f', vector).tobytes()) for key, vector in items.items()]
+            with self._db_lock:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+                self._db.commit()
+                # Replaced rows count as new, so the table stays within 10% of max_disk_size
+                self._disk_rows += len(rows)
+                if self.max_disk_size > 0 and self._disk_rows > self.max_disk_size * 1.1:
+                    self._prune_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "disk_rows": self._disk_rows if self._db is not None else None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None
+            }
+
+embedding_cache = EmbeddingCache(
+    EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL, EMBEDDING_CACHE_PATH or None, EMBEDDING_CACHE_DISK_SIZE
+)
@@ -1,37 +1,187 @@
 """
-Embedding generation using OpenAI or sentence-transformers
+Embedding generation using a registry of OpenAI and sentence-transformers providers
 """
-from typing import List
+import threading
+import time
+from typing import Dict, Any, List, Optional
 from fastapi import HTTPException
-from .config import OPENAI_API_KEY
+from .config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_EMBEDDING_MODEL, OPENAI_EMBEDDING_DIMENSIONS,
+    LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_MODELS, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE
+)
+from .embedding_cache import embedding_cache, cache_key
+from .openai_embeddings import AsyncOpenAIEmbedder
+from .metrics import stage, observe_batch
 
-# Initialize OpenAI client
-openai_client = None
+# Dimensions of well-known models, so collections can be created without loading weights
+KNOWN_DIMENSIONS = {
+    "all-MiniLM-L6-v2": 384,
+    "all-MiniLM-L12-v2": 384,
+    "all-mpnet-base-v2": 768,
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
 
-if OPENAI_API_KEY:
-    try:
-        from openai import OpenAI
-        openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    except Exception as e:
-        print(f"OpenAI client initialization failed: {e}")
-        print("Falling back to sentence-transformers")
-        openai_client = None
-
-def generate_embedding(text: str) -> List[float]:
-    """Generate embeddings using OpenAI or fallback to sentence-transformers"""
-    if openai_client:
-        try:
-            response = openai_client.embeddings.create(
-                input=text,
-                model="text-embedding-ada-002"
+class EmbeddingProvider:
+    """A named embedding model with fixed output dimensions"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.load_seconds = None
+        self.encode_calls = 0
+        self.encode_seconds_total = 0.0
+        self.last_encode_seconds = None
+
+    @property
+    def dimensions(self) -> int:
+        return KNOWN_DIMENSIONS[self.name]
+
+    def _encode(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        raise NotImplementedError
+
+    def encode(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+        start = time.perf_counter()
+        embeddings = self._encode(texts, batch_size)
+        elapsed = time.perf_counter() - start
+        self.encode_calls += 1
+        self.encode_seconds_total += elapsed
+        self.last_encode_seconds = elapsed
+        return embeddings
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dimensions": KNOWN_DIMENSIONS.get(self.name),
+            "model_load_seconds": self.load_seconds,
+            "encode_calls": self.encode_calls,
+            "encode_seconds_total": self.encode_seconds_total,
+            "last_encode_seconds": self.last_encode_seconds,
+            "avg_encode_seconds": (
+                self.encode_seconds_total / self.encode_calls if self.encode_calls else None
             )
-            return response.data[0].embedding
-        except Exception as e:
-            print(f"OpenAI embedding failed: {e}")
-    
+        }
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """Local sentence-transformers model, loaded once per process and shared by all routes"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def get_model(self):
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                start = time.perf_counter()
+                self._model = SentenceTransformer(self.name)
+                self.load_seconds = time.perf_counter() - start
+                KNOWN_DIMENSIONS.setdefault(self.name, self._model.get_sentence_embedding_dimension())
+                print(f"Loaded embedding model {self.name} in {self.load_seconds:.2f}s")
+        return self._model
+
+    @property
+    def dimensions(self) -> int:
+        if self.name not in KNOWN_DIMENSIONS:
+            self.get_model()
+        return KNOWN_DIMENSIONS[self.name]
+
+    def _encode(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        return self.get_model().encode(texts, batch_size=batch_size).tolist()
+
+class OpenAIProvider(EmbeddingProvider):
+    """OpenAI embeddings API through the pooled async client"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.client = AsyncOpenAIEmbedder(name)
+        # The API is not asked for shortened vectors, so known models keep their native size
+        if OPENAI_EMBEDDING_DIMENSIONS and name not in KNOWN_DIMENSIONS:
+            KNOWN_DIMENSIONS[name] = OPENAI_EMBEDDING_DIMENSIONS
+
+    def _encode(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        # batch_size sizes local forward passes; API requests use OPENAI_BATCH_SIZE
+        return self.client.embed(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "client": self.client.stats()}
+
+providers: Dict[str, EmbeddingProvider] = {}
+
+def register_provider(provider: EmbeddingProvider):
+    """Make an embedding model selectable by name"""
+    providers[provider.name] = provider
+
+for _name in LOCAL_EMBEDDING_MODELS:
+    register_provider(SentenceTransformerProvider(_name))
+
+# A base URL without a key targets an OpenAI-compatible or mock server
+if OPENAI_API_KEY or OPENAI_BASE_URL:
+    register_provider(OpenAIProvider(OPENAI_EMBEDDING_MODEL))
+
+DEFAULT_EMBEDDING_MODEL = EMBEDDING_MODEL or (
+    OPENAI_EMBEDDING_MODEL if OPENAI_EMBEDDING_MODEL in providers else LOCAL_EMBEDDING_MODEL
+)
+
+def get_provider(model: Optional[str] = None) -> EmbeddingProvider:
+    """Look up a registered embedding model, defaulting to DEFAULT_EMBEDDING_MODEL"""
+    name = model or DEFAULT_EMBEDDING_MODEL
+    provider = providers.get(name)
+    if provider is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown embedding model '{name}'. Available: {sorted(providers)}"
+        )
+    return provider
+
+def preload_default_model():
+    """Load the default model's weights now instead of on the first request"""
+    provider = get_provider()
+    if isinstance(provider, SentenceTransformerProvider):
+        provider.get_model()
+
+def get_embedding_stats() -> dict:
+    """Per-model load time and encode timings, plus cache counters"""
+    return {
+        "default_model": DEFAULT_EMBEDDING_MODEL,
+        "models": {name: provider.stats() for name, provider in providers.items()},
+        "cache": embedding_cache.stats()
+    }
+
+def generate_embedding(text: str, model: Optional[str] = None) -> List[float]:
+    """Generate an embedding with the selected model"""
+    return generate_embeddings([text], model=model)[0]
+
+def generate_embeddings(
+    texts: List[str],
+    model: Optional[str] = None,
+    batch_size: int = EMBEDDING_BATCH_SIZE
+) -> List[List[float]]:
+    """Generate embeddings for many texts, encoding only cache misses in one batched call.
+
+    There is deliberately no fallback to another model: vectors of different
+    models live in different collections and must never be mixed.
+    """
+    if not texts:
+        return []
+
+    provider = get_provider(model)
+    keys = [cache_key(provider.name, text) for text in texts]
+    embeddings = [embedding_cache.get(key) for key in keys]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if not missing:
+        return embeddings
+
+    observe_batch(provider.name, len(missing))
     try:
-        from sentence_transformers import SentenceTransformer
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        return model.encode(text).tolist()
+        with stage("embed"):
+            encoded = provider.encode([texts[i] for i in missing], batch_size)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {e}")
+        raise HTTPException(status_code=502, detail=f"Embedding generation with {provider.name} failed: {e}")
+
+    for i, embedding in zip(missing, encoded):
+        embeddings[i] = embedding
+    embedding_cache.put_many({keys[i]: embedding for i, embedding in zip(missing, encoded)})
+    return embeddings
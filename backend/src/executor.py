@@ -0,0 +1,54 @@
+"""
+Dedicated thread pool for embedding and vector-store work off the event loop
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from .config import WORK_POOL_SIZE, WORK_MAX_CONCURRENCY
+
+_executor = ThreadPoolExecutor(max_workers=WORK_POOL_SIZE, thread_name_prefix="work")
+_semaphore = asyncio.Semaphore(WORK_MAX_CONCURRENCY)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "waiting": 0,
+    "running": 0,
+    "completed": 0,
+    "max_waiting": 0,
+}
+
+def _adjust(key: str, delta: int):
+    with _stats_lock:
+        _stats[key] += delta
+        if key == "waiting" and _stats["waiting"] > _stats["max_waiting"]:
+            _stats["max_waiting"] = _stats["waiting"]
+
+async def run_in_pool(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the work pool, bounded by WORK_MAX_CONCURRENCY"""
+    _adjust("waiting", 1)
+    async with _semaphore:
+        _adjust("waiting", -1)
+        _adjust("running", 1)
+        try:
+            loop = asyncio.get_running_loop()
+            # Carry the caller's context so per-request stage timings reach the worker
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(_executor, functools.partial(context.run, fn, *args, **kwargs))
+        finally:
+            _adjust("running", -1)
+            _adjust("completed", 1)
+
+def get_executor_stats() -> Dict[str, int]:
+    """Queue depth and concurrency of the work pool"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["pool_size"] = WORK_POOL_SIZE
+    stats["max_concurrency"] = WORK_MAX_CONCURRENCY
+    return stats
+
+def shutdown():
+    """Stop the work pool, waiting for in-flight calls"""
+    _executor.shutdown(wait=True)
@@ -0,0 +1,204 @@
+"""
+Batched ingest pipeline: embed chunks in batches and upsert them into ChromaDB in bulk
+"""
+import hashlib
+import json
+from collections import Counter
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional
+from .config import UPLOAD_BATCH_SIZE
+from .models import ChunkData
+from .database import get_collection, bump_generation
+from .embeddings import generate_embeddings, get_provider, DEFAULT_EMBEDDING_MODEL
+from . import aggregates, bm25, metadata_index, quantized, sync
+from .metrics import stage
+
+# ChromaDB metadata values must be scalars, so each attribute is also stored
+# as its own boolean key to make it filterable in where clauses
+ATTRIBUTE_PREFIX = "attr:"
+
+def attribute_key(attribute: str) -> str:
+    return f"{ATTRIBUTE_PREFIX}{attribute}"
+
+def attribute_flags(attributes: List[str]) -> Dict[str, bool]:
+    return {attribute_key(attribute): True for attribute in attributes}
+
+def content_hash(text: str, model: str) -> str:
+    """Identifies an embedding: the same text under the same model never needs re-embedding"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+def chunk_metadata(chunk: ChunkData, model: Optional[str] = None) -> Dict[str, Any]:
+    """Build the ChromaDB metadata stored alongside a chunk"""
+    return {
+        **attribute_flags(chunk.attributes),
+        "content_hash": content_hash(chunk.text, get_provider(model).name),
+        "source_doc_id": chunk.source_doc_id,
+        "chunk_index": chunk.chunk_index,
+        "section_heading": chunk.section_heading,
+        "doi": chunk.doi or "",
+        "journal": chunk.journal,
+        "publish_year": chunk.publish_year,
+        "usage_count": chunk.usage_count,
+        "attributes": json.dumps(chunk.attributes),
+        "link": chunk.link
+    }
+
+def iter_batches(chunks: Iterable[ChunkData], batch_size: int) -> Iterator[List[ChunkData]]:
+    """Group an iterable of chunks into lists of at most batch_size"""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _comparable(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    # Cleared attribute flags are stored as False, which is the same as absent;
+    # usage_count belongs to the server once a chunk is stored
+    return {
+        key: value for key, value in metadata.items()
+        if key != "usage_count" and not (key.startswith(ATTRIBUTE_PREFIX) and value is False)
+    }
+
+class BatchPlan:
+    """What writing a batch involves once it is compared with the stored chunks"""
+
+    def __init__(self):
+        self.to_embed: List[ChunkData] = []
+        self.metadata_only: List[ChunkData] = []
+        self.metadatas: Dict[str, Dict[str, Any]] = {}
+        self.existing: Dict[str, Dict[str, Any]] = {}
+        self.skipped = 0
+
+def plan_batch(
+    batch: List[ChunkData],
+    model: Optional[str] = None,
+    pending: Optional[BatchPlan] = None
+) -> BatchPlan:
+    """Split a batch into new or changed text (embed), changed metadata (update) and unchanged (skip)
+
+    pending is an earlier plan that will be written first but has not been yet;
+    its chunks count as stored, so an id repeated across the two is not inserted twice.
+    """
+    provider = get_provider(model)
+    plan = BatchPlan()
+    # A repeated id within a batch keeps its last version
+    latest = {chunk.id: chunk for chunk in batch}
+    plan.skipped = len(batch) - len(latest)
+
+    with stage("ingest_plan"):
+        stored = get_collection(provider.name).get(ids=list(latest), include=["metadatas"])
+    plan.existing = dict(zip(stored['ids'], stored['metadatas']))
+    if pending is not None:
+        for chunk_id in latest:
+            if chunk_id in pending.metadatas:
+                plan.existing[chunk_id] = {**plan.existing.get(chunk_id, {}), **pending.metadatas[chunk_id]}
+
+    for chunk_id, chunk in latest.items():
+        metadata = chunk_metadata(chunk, provider.name)
+        old = plan.existing.get(chunk_id)
+        if old is None:
+            plan.to_embed.append(chunk)
+            plan.metadatas[chunk_id] = metadata
+            continue
+
+        # usage_count is maintained by the server after the first upload. Chroma merges
+        # metadata keys on write, so leaving it out keeps increments flushed at any time
+        del metadata["usage_count"]
+        metadata.update({
+            key: False for key, value in old.items()
+            if key.startswith(ATTRIBUTE_PREFIX) and value is True and key not in metadata
+        })
+        if _comparable(metadata) == _comparable(old):
+            plan.skipped += 1
+            continue
+        plan.metadatas[chunk_id] = metadata
+        if old.get("content_hash") == metadata["content_hash"]:
+            plan.metadata_only.append(chunk)
+        else:
+            plan.to_embed.append(chunk)
+    return plan
+
+def embed_batch(batch: List[ChunkData], model: Optional[str] = None) -> List[List[float]]:
+    """Embed the text of one batch of chunks"""
+    return generate_embeddings([chunk.text for chunk in batch], model=model)
+
+def write_batch(
+    plan: BatchPlan,
+    embeddings: List[List[float]],
+    model: Optional[str] = None,
+    update_aggregates: bool = True
+) -> Dict[str, int]:
+    """Upsert re-embedded chunks and update metadata-only changes, returning inserted/updated/skipped counts.
+
+    update_aggregates=False suits offline indexing: the server rebuilds its
+    usage aggregates from the store at startup anyway.
+    """
+    provider = get_provider(model)
+    if any(len(embedding) != provider.dimensions for embedding in embeddings):
+        raise ValueError(f"{provider.name} embeddings must have {provider.dimensions} dimensions")
+
+    collection = get_collection(provider.name)
+    embedded_ids = [chunk.id for chunk in plan.to_embed]
+    with stage("ingest_write"):
+        if embedded_ids:
+            collection.upsert(
+                ids=embedded_ids,
+                embeddings=embeddings,
+                documents=[chunk.text for chunk in plan.to_embed],
+                metadatas=[plan.metadatas[chunk_id] for chunk_id in embedded_ids]
+            )
+        if plan.metadata_only:
+            collection.update(
+                ids=[chunk.id for chunk in plan.metadata_only],
+                metadatas=[plan.metadatas[chunk.id] for chunk in plan.metadata_only]
+            )
+
+    written = list(plan.metadatas)
+    updated = [chunk_id for chunk_id in written if chunk_id in plan.existing]
+    counts = {
+        "inserted": len(written) - len(updated),
+        "updated": len(updated),
+        "skipped": plan.skipped
+    }
+    if not written:
+        return counts
+    bump_generation()
+
+    # The default model's collection is the primary store that journal
+    # lookups, statistics and lexical search are derived from
+    if provider.name == DEFAULT_EMBEDDING_MODEL:
+        metadata_index.add_chunks(written, [plan.metadatas[chunk_id] for chunk_id in written])
+        if embedded_ids:
+            bm25.add(embedded_ids, [chunk.text for chunk in plan.to_embed])
+            quantized.add(embedded_ids, embeddings)
+        if update_aggregates:
+            aggregates.record_chunks(
+                plan.metadatas[chunk_id] for chunk_id in written if chunk_id not in plan.existing
+            )
+            aggregates.record_replaced(
+                [plan.existing[chunk_id] for chunk_id in updated],
+                [plan.metadatas[chunk_id] for chunk_id in updated]
+            )
+        sync.publish_chunks(written)
+    return counts
+
+def ingest_batch(batch: List[ChunkData], model: Optional[str] = None) -> Dict[str, int]:
+    """Embed the new and changed chunks of one batch and write them to the collection"""
+    plan = plan_batch(batch, model)
+    return write_batch(plan, embed_batch(plan.to_embed, model), model)
+
+def ingest_chunks(
+    chunks: Iterable[ChunkData],
+    batch_size: int = UPLOAD_BATCH_SIZE,
+    model: Optional[str] = None,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> Dict[str, int]:
+    """Embed and store chunks batch by batch, returning inserted/updated/skipped counts"""
+    counts = Counter(inserted=0, updated=0, skipped=0)
+    for batch in iter_batches(chunks, batch_size):
+        counts.update(ingest_batch(batch, model))
+        if on_batch:
+            on_batch(len(batch))
+    return dict(counts)
@@ -0,0 +1,190 @@
+"""
+Background ingest queue with a bounded worker pool
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional
+from .config import INGEST_WORKERS, INGEST_QUEUE_SIZE, INGEST_JOB_HISTORY, UPLOAD_BATCH_SIZE
+from .models import ChunkData
+from .ingest import iter_batches, plan_batch, embed_batch, write_batch
+from . import sync
+
+class QueueFullError(Exception):
+    """Raised when the ingest queue cannot accept another job"""
+
+class IngestJob:
+    """Progress of a single background ingest"""
+
+    def __init__(
+        self,
+        chunks: Optional[Iterable[ChunkData]],
+        batch_size: int,
+        total_chunks: Optional[int] = None,
+        model: Optional[str] = None
+    ):
+        self.id = uuid.uuid4().hex
+        # Stream jobs record parse failures on the event loop while a batch
+        # is processed in the pool, so counter updates go through this lock
+        self._lock = threading.Lock()
+        self.chunks = chunks
+        self.batch_size = batch_size
+        self.model = model
+        self.status = "queued"
+        self.total_chunks = total_chunks
+        self.chunks_embedded = 0
+        self.chunks_written = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failures = 0
+        self.errors: List[str] = []
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.status = "running"
+        self.started_at = time.time()
+
+    def process_batch(self, batch: List[ChunkData]):
+        """Embed and write the new and changed chunks of one batch, counting failures instead of raising"""
+        try:
+            plan = plan_batch(batch, self.model)
+            embeddings = embed_batch(plan.to_embed, self.model)
+            with self._lock:
+                self.chunks_embedded += len(plan.to_embed)
+            counts = write_batch(plan, embeddings, self.model)
+            with self._lock:
+                self.inserted += counts["inserted"]
+                self.updated += counts["updated"]
+                self.skipped += counts["skipped"]
+                self.chunks_written += counts["inserted"] + counts["updated"]
+        except Exception as e:
+            self.record_failure(len(batch), str(e))
+        sync.publish_job(self.to_dict())
+
+    def record_failure(self, count: int, error: str):
+        with self._lock:
+            self.failures += count
+            if len(self.errors) < 10:
+                self.errors.append(error)
+
+    def finish(self):
+        with self._lock:
+            self.finished_at = time.time()
+            succeeded = self.chunks_written + self.skipped
+            if self.total_chunks is None:
+                # A stream job learns its size only once the stream ends
+                self.total_chunks = succeeded + self.failures
+            self.status = "failed" if self.failures and not succeeded else "completed"
+        sync.publish_job(self.to_dict())
+
+    def fail(self, error: str):
+        with self._lock:
+            self.errors.append(error)
+            self.status = "failed"
+            self.finished_at = time.time()
+        sync.publish_job(self.to_dict())
+
+    def run(self):
+        self.start()
+        for batch in iter_batches(self.chunks, self.batch_size):
+            self.process_batch(batch)
+        # Release the submitted chunks once they are stored
+        self.chunks = None
+        self.finish()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "embedding_model": self.model,
+            "total_chunks": self.total_chunks,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_written": self.chunks_written,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "errors": list(self.errors),
+            "elapsed_seconds": elapsed,
+            "chunks_per_second": (self.chunks_written + self.skipped) / elapsed if elapsed > 0 else 0.0
+        }
+
+_queue: "queue.Queue[IngestJob]" = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+_jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_workers: List[threading.Thread] = []
+
+def _worker():
+    while True:
+        job = _queue.get()
+        try:
+            job.run()
+        except Exception as e:
+            job.fail(str(e))
+        finally:
+            _queue.task_done()
+
+def start_workers(count: int = INGEST_WORKERS):
+    """Start the ingest worker threads if they are not running yet"""
+    with _jobs_lock:
+        if _workers:
+            return
+        for i in range(count):
+            thread = threading.Thread(target=_worker, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            _workers.append(thread)
+
+def _register(job: IngestJob):
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > INGEST_JOB_HISTORY:
+            _jobs.popitem(last=False)
+
+def submit_job(
+    chunks: Iterable[ChunkData],
+    batch_size: int = UPLOAD_BATCH_SIZE,
+    total_chunks: Optional[int] = None,
+    model: Optional[str] = None
+) -> IngestJob:
+    """Queue chunks for background ingest, raising QueueFullError under backpressure"""
+    start_workers()
+    job = IngestJob(chunks, batch_size, total_chunks, model)
+    try:
+        _queue.put_nowait(job)
+    except queue.Full:
+        raise QueueFullError("Ingest queue is full, retry later")
+
+    _register(job)
+    return job
+
+def create_stream_job(batch_size: int = UPLOAD_BATCH_SIZE, model: Optional[str] = None) -> IngestJob:
+    """Register a job whose batches are fed by the caller as a stream arrives"""
+    job = IngestJob(None, batch_size, model=model)
+    _register(job)
+    job.start()
+    return job
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    """Look up a submitted ingest job"""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def get_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Progress of a job run by this worker or, in multi-worker mode, by another"""
+    job = get_job(job_id)
+    return job.to_dict() if job is not None else sync.get_job(job_id)
+
+def queue_depth() -> int:
+    """Number of jobs waiting for a worker"""
+    return _queue.qsize()
@@ -0,0 +1,32 @@
+"""
+Incremental JSON array reading, shared by the bulk indexer and the upload scripts
+
+Standard library only, so scripts can import it with backend/src on sys.path.
+"""
+import json
+from typing import Any, Iterator, TextIO
+
+def iter_json_array(f: TextIO, read_size: int = 65536) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(read_size).lstrip()
+    if not buffer.startswith("["):
+        raise json.JSONDecodeError("Expected a JSON array", buffer, 0)
+    buffer = buffer[1:]
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(read_size)
+            eof = not more
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
@@ -0,0 +1,125 @@
+"""
+Startup lifecycle: open the store, build derived indexes and warm up before reporting ready
+"""
+import threading
+import time
+from typing import Callable, Dict, Any, Optional
+from .config import COLLECTION_NAME, PRELOAD_EMBEDDING_MODEL, WARMUP_QUERY, STARTUP_RETRIES
+from . import sync
+
+_started_at = time.time()
+_ready_at: Optional[float] = None
+_state = "starting"
+_current_step: Optional[str] = None
+_error: Optional[str] = None
+_step_seconds: Dict[str, float] = {}
+_attempts = 0
+_thread: Optional[threading.Thread] = None
+
+def _step(name: str, fn: Callable[[], Any]):
+    """Run a startup step unless an earlier attempt already completed it"""
+    global _current_step
+    if name in _step_seconds:
+        return
+    _current_step = name
+    start = time.perf_counter()
+    fn()
+    _step_seconds[name] = time.perf_counter() - start
+
+def _open_store():
+    from .database import get_collection
+    from .migrations import adopt_legacy_collection, legacy_chunks_pending
+    get_collection().count()
+    # After an upgrade the pre-registry collection is copied into its model's
+    # still-empty collection, so its chunks stay searchable without `just migrate`
+    try:
+        with sync.process_lock("legacy_collection"):
+            adopt_legacy_collection(only_into_empty=True)
+        pending = legacy_chunks_pending()
+    except ValueError as e:
+        print(f"Warning: the legacy '{COLLECTION_NAME}' collection is not searched: {e}")
+        return
+    if pending:
+        print(
+            f"Warning: the legacy '{COLLECTION_NAME}' collection holds {pending} more chunks than "
+            f"its model's collection and is not searched; run `just migrate` to copy them over"
+        )
+
+def _load_model():
+    from .embeddings import preload_default_model
+    preload_default_model()
+
+def _build_indexes():
+    from . import aggregates, bm25, metadata_index
+    # Writes by other workers after this point reach us through the event log
+    sync.mark()
+    aggregates.ensure_loaded()
+    metadata_index.ensure_built()
+    bm25.ensure_loaded()
+
+def _warm_up():
+    """Run one real embedding and query so the first request does not pay for lazy setup"""
+    from .database import get_collection
+    from .embeddings import get_provider
+    embedding = get_provider().encode([WARMUP_QUERY])[0]
+    collection = get_collection()
+    if collection.count():
+        collection.query(query_embeddings=[embedding], n_results=1, include=["distances"])
+
+def _steps():
+    _step("open_store", _open_store)
+    if PRELOAD_EMBEDDING_MODEL:
+        _step("load_model", _load_model)
+    _step("build_indexes", _build_indexes)
+    sync.start()
+    if WARMUP_QUERY:
+        _step("warm_up", _warm_up)
+
+def _run():
+    """Run the startup steps, retrying with backoff, e.g. while a Chroma server comes up"""
+    global _state, _error, _current_step, _ready_at, _attempts
+    while True:
+        _attempts += 1
+        try:
+            _steps()
+            break
+        except Exception as e:
+            _error = f"{_current_step}: {e}"
+            if _attempts > STARTUP_RETRIES:
+                _state = "failed"
+                print(f"Startup failed during {_error}")
+                return
+            delay = min(2 ** _attempts, 30)
+            print(f"Startup attempt {_attempts} failed during {_error}; retrying in {delay}s")
+            time.sleep(delay)
+
+    _current_step = None
+    _error = None
+    _ready_at = time.time()
+    _state = "ready"
+    print(f"Ready in {_ready_at - _started_at:.2f}s: {_step_seconds}")
+
+def start():
+    """Initialize in the background so liveness answers while the service warms up"""
+    global _thread
+    if _thread is None:
+        _thread = threading.Thread(target=_run, name="startup", daemon=True)
+        _thread.start()
+
+def is_ready() -> bool:
+    return _state == "ready"
+
+def has_failed() -> bool:
+    """Startup gave up; restarting the process is the only way forward"""
+    return _state == "failed"
+
+def status() -> Dict[str, Any]:
+    return {
+        "status": _state,
+        "current_step": _current_step,
+        "error": _error,
+        "attempts": _attempts,
+        "uptime_seconds": time.time() - _started_at,
+        "startup_seconds": _ready_at - _started_at if _ready_at else None,
+        "steps": dict(_step_seconds)
+    }
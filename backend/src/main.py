@@ -1,14 +1,32 @@
 """
 Research Assistant API - Main application entry point
 """
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from .config import HOST, PORT, FRONTEND_URL
-from .routes import upload, search, journals, stats
+from .config import (
+    HOST, PORT, FRONTEND_URL, METRICS_ENABLED, REQUEST_TIMINGS_ENABLED, WORKERS, CHROMA_HOST
+)
+from . import bm25, executor, lifecycle, metrics, sync, usage
+from .routes import upload, search, journals, stats, health
+from .routes import metrics as metrics_route
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Opening the store, loading the model and warming up run in the
+    # background; /health/ready reports when they are done
+    sync.hold_server_lock()
+    lifecycle.start()
+    yield
+    executor.shutdown()
+    usage.stop()
+    sync.stop()
+    bm25.stop()
 
-app = FastAPI(title="Research Assistant API", version="1.0.0")
+app = FastAPI(title="Research Assistant API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +36,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Only installed when needed, so disabled instrumentation adds no per-request work
+if METRICS_ENABLED or REQUEST_TIMINGS_ENABLED:
+    @app.middleware("http")
+    async def record_timings(request: Request, call_next):
+        timings = None
+        if REQUEST_TIMINGS_ENABLED and "x-request-timings" in request.headers:
+            timings = metrics.begin_request_timings()
+        start = time.perf_counter()
+        response = await call_next(request)
+        elapsed = time.perf_counter() - start
+
+        if METRICS_ENABLED:
+            route = request.scope.get("route")
+            metrics.REQUEST_SECONDS.observe(
+                elapsed, request.method, route.path if route else "unmatched", str(response.status_code)
+            )
+        if timings is not None:
+            response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed * 1000)
+        return response
+
+app.include_router(health.router, tags=["health"])
+app.include_router(metrics_route.router, tags=["metrics"])
 app.include_router(upload.router, prefix="/api", tags=["upload"])
 app.include_router(search.router, prefix="/api", tags=["search"])
 app.include_router(stats.router, prefix="/api", tags=["statistics"])
@@ -28,4 +68,7 @@ async def root():
     return {"message": "Research Assistant API", "version": "1.0.0"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host=HOST, port=PORT)
+    if WORKERS > 1 and not CHROMA_HOST:
+        raise SystemExit("WORKERS > 1 needs a shared Chroma server: set CHROMA_HOST (see `just chroma-server`)")
+    # Each worker process loads its own copy of the embedding model at startup
+    uvicorn.run("src.main:app", host=HOST, port=PORT, workers=WORKERS)
@@ -0,0 +1,150 @@
+"""
+Local SQLite secondary index from source_doc_id, journal and publish_year to chunk ids
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from .config import METADATA_INDEX_PATH
+from .database import get_collection
+from . import sync
+
+_lock = threading.Lock()
+_db: Optional[sqlite3.Connection] = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    source_doc_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    journal TEXT,
+    publish_year INTEGER
+);
+DROP INDEX IF EXISTS chunks_by_doc;
+CREATE INDEX IF NOT EXISTS chunks_by_doc_key ON chunks (source_doc_id, chunk_index, id);
+CREATE INDEX IF NOT EXISTS chunks_by_journal ON chunks (journal, source_doc_id);
+CREATE INDEX IF NOT EXISTS chunks_by_year ON chunks (publish_year, source_doc_id);
+"""
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(os.path.abspath(METADATA_INDEX_PATH)), exist_ok=True)
+        _db = sqlite3.connect(METADATA_INDEX_PATH, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.executescript(_SCHEMA)
+    return _db
+
+def _rows(ids: Iterable[str], metadatas: Iterable[Dict[str, Any]]) -> List[tuple]:
+    return [
+        (
+            chunk_id,
+            metadata['source_doc_id'],
+            metadata.get('chunk_index', 0),
+            metadata.get('journal'),
+            metadata.get('publish_year')
+        )
+        for chunk_id, metadata in zip(ids, metadatas)
+    ]
+
+def add_chunks(ids: List[str], metadatas: List[Dict[str, Any]]):
+    """Insert or replace index entries for stored chunks"""
+    with _lock:
+        db = _connect()
+        db.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)", _rows(ids, metadatas))
+        db.commit()
+
+def ensure_built(page_size: int = 5000):
+    """Rebuild the index from the collection when the two have drifted apart"""
+    with _lock, sync.process_lock("metadata_index"):
+        db = _connect()
+        indexed = db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        if indexed == get_collection().count():
+            return
+
+        db.execute("DELETE FROM chunks")
+        offset = 0
+        while True:
+            page = get_collection().get(include=["metadatas"], limit=page_size, offset=offset)
+            db.executemany(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                _rows(page['ids'], page['metadatas'])
+            )
+            if len(page['ids']) < page_size:
+                break
+            offset += page_size
+        db.commit()
+
+def chunk_ids_for_document(
+    source_doc_id: str,
+    after: Optional[Tuple[int, Optional[str]]] = None,
+    limit: Optional[int] = None
+) -> List[Tuple[str, int]]:
+    """(id, chunk_index) pairs for a document ordered by chunk_index, then id
+
+    after is the (chunk_index, id) of the last pair already returned; chunk_index
+    is not unique, so the id breaks ties. An id of None skips the whole chunk_index.
+    """
+    query = "SELECT id, chunk_index FROM chunks WHERE source_doc_id = ?"
+    params: list = [source_doc_id]
+    if after is not None:
+        chunk_index, chunk_id = after
+        if chunk_id is None:
+            query += " AND chunk_index > ?"
+            params.append(chunk_index)
+        else:
+            query += " AND (chunk_index > ? OR (chunk_index = ? AND id > ?))"
+            params += [chunk_index, chunk_index, chunk_id]
+    query += " ORDER BY chunk_index, id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    with _lock:
+        return _connect().execute(query, params).fetchall()
+
+def count_chunks_for_document(source_doc_id: str) -> int:
+    """Number of chunks stored for a document"""
+    with _lock:
+        return _connect().execute(
+            "SELECT COUNT(*) FROM chunks WHERE source_doc_id = ?", (source_doc_id,)
+        ).fetchone()[0]
+
+def list_documents(
+    journal: Optional[str] = None,
+    publish_year: Optional[int] = None,
+    limit: int = 100,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """Documents with their journal, year and chunk count"""
+    query = (
+        "SELECT source_doc_id, journal, publish_year, COUNT(*) FROM chunks"
+    )
+    clauses, params = [], []
+    if journal is not None:
+        clauses.append("journal = ?")
+        params.append(journal)
+    if publish_year is not None:
+        clauses.append("publish_year = ?")
+        params.append(publish_year)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " GROUP BY source_doc_id ORDER BY source_doc_id LIMIT ? OFFSET ?"
+    params += [limit, offset]
+    with _lock:
+        rows = _connect().execute(query, params).fetchall()
+    return [
+        {"source_doc_id": doc_id, "journal": journal, "publish_year": year, "chunk_count": count}
+        for doc_id, journal, year, count in rows
+    ]
+
+def list_journals() -> List[Dict[str, Any]]:
+    """Journals with their document and chunk counts"""
+    with _lock:
+        rows = _connect().execute(
+            "SELECT journal, COUNT(DISTINCT source_doc_id), COUNT(*) FROM chunks "
+            "GROUP BY journal ORDER BY journal"
+        ).fetchall()
+    return [
+        {"journal": journal, "document_count": documents, "chunk_count": chunks}
+        for journal, documents, chunks in rows
+    ]
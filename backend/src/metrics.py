@@ -0,0 +1,130 @@
+"""
+In-process latency histograms and counters with Prometheus text exposition
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from .config import METRICS_ENABLED
+
+PREFIX = "research_assistant"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = f"{PREFIX}_{name}"
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _labels(self.label_names, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+class Gauges:
+    """Values read from a callback at scrape time, so the hot path pays nothing for them"""
+
+    def __init__(self, name: str, help: str, label: str, read: Callable[[], Dict[str, float]], kind: str = "gauge"):
+        self.name = f"{PREFIX}_{name}"
+        self.help = help
+        self.label = label
+        self.read = read
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.read()
+        except Exception as e:
+            return lines + [f"# {self.name} unavailable: {e}"]
+        for key, value in sorted(values.items()):
+            if value is None:
+                continue
+            labels = f'{{{self.label}="{key}"}}' if self.label else ""
+            lines.append(f"{self.name}{labels} {float(value)}")
+        return lines
+
+REQUEST_SECONDS = Histogram("http_request_seconds", "HTTP request latency by route", ["method", "route", "status"])
+STAGE_SECONDS = Histogram("stage_seconds", "Latency of individual request stages", ["stage"])
+EMBED_BATCH_SIZE = Histogram("embedding_batch_size", "Texts per embedding model call", ["model"], BATCH_BUCKETS)
+
+_registry: List = [REQUEST_SECONDS, STAGE_SECONDS, EMBED_BATCH_SIZE]
+
+def register(metric):
+    _registry.append(metric)
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Per-request stage timings in ms, set only when the client asked for them
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def begin_request_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into the stage histogram and, if requested, the per-request timings"""
+    timings = _request_timings.get()
+    if not METRICS_ENABLED and timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if METRICS_ENABLED:
+            STAGE_SECONDS.observe(elapsed, name)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed * 1000
+
+def observe_batch(model: str, size: int):
+    if METRICS_ENABLED:
+        EMBED_BATCH_SIZE.observe(size, model)
+
+def server_timing(timings: Dict[str, float], total_ms: float) -> str:
+    """Format timings as a Server-Timing header value"""
+    parts = [f"{name};dur={ms:.2f}" for name, ms in timings.items()]
+    parts.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(parts)
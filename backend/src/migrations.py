@@ -0,0 +1,111 @@
+"""
+One-off data migrations for the research papers collection
+
+Run with: python -m src.migrations
+"""
+import json
+from typing import Optional
+from .config import COLLECTION_NAME
+from .database import get_chroma_client, get_collection, bump_generation
+from .embeddings import providers
+from .ingest import ATTRIBUTE_PREFIX, attribute_flags
+
+def migrate_attribute_flags(page_size: int = 1000) -> int:
+    """Add filterable attribute keys to chunks stored with only the JSON attributes string"""
+    migrated = 0
+    offset = 0
+    while True:
+        page = get_collection().get(include=["metadatas"], limit=page_size, offset=offset)
+        ids, metadatas = [], []
+        for chunk_id, metadata in zip(page['ids'], page['metadatas']):
+            if any(key.startswith(ATTRIBUTE_PREFIX) for key in metadata):
+                continue
+            try:
+                attributes = json.loads(metadata.get('attributes') or "[]")
+            except (TypeError, ValueError):
+                continue
+            if attributes:
+                ids.append(chunk_id)
+                # Chroma merges metadata on update, so only the new keys are written
+                # and a usage_count flushed meanwhile is kept
+                metadatas.append(attribute_flags(attributes))
+
+        if ids:
+            get_collection().update(ids=ids, metadatas=metadatas)
+            migrated += len(ids)
+        if len(page['ids']) < page_size:
+            break
+        offset += page_size
+
+    if migrated:
+        bump_generation()
+    return migrated
+
+def _legacy_collection():
+    try:
+        return get_chroma_client().get_collection(COLLECTION_NAME)
+    except Exception:
+        return None
+
+def _legacy_model(legacy) -> Optional[str]:
+    """The registered model whose vectors match the legacy collection's, None if it is empty"""
+    sample = legacy.get(limit=1, include=["embeddings"])
+    if not sample['ids']:
+        return None
+    dimensions = len(sample['embeddings'][0])
+    matches = [name for name, provider in providers.items() if provider.dimensions == dimensions]
+    if not matches:
+        raise ValueError(f"No registered embedding model produces {dimensions}-d vectors")
+    return matches[0]
+
+def legacy_chunks_pending() -> int:
+    """Chunks in the pre-registry collection beyond what their model's collection holds"""
+    legacy = _legacy_collection()
+    if legacy is None:
+        return 0
+    model = _legacy_model(legacy)
+    if model is None:
+        return 0
+    return max(legacy.count() - get_collection(model).count(), 0)
+
+def adopt_legacy_collection(page_size: int = 1000, only_into_empty: bool = False) -> int:
+    """Copy the pre-registry single collection into the per-model collection matching its dimensions
+
+    only_into_empty leaves a target that already holds chunks alone, so newer
+    writes there are never overwritten by the legacy copies.
+    """
+    legacy = _legacy_collection()
+    if legacy is None:
+        return 0
+    model = _legacy_model(legacy)
+    if model is None:
+        return 0
+
+    target = get_collection(model)
+    if only_into_empty and target.count():
+        return 0
+    copied = 0
+    offset = 0
+    while True:
+        page = legacy.get(
+            include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+        )
+        if page['ids']:
+            target.upsert(
+                ids=page['ids'],
+                embeddings=page['embeddings'],
+                documents=page['documents'],
+                metadatas=page['metadatas']
+            )
+            copied += len(page['ids'])
+        if len(page['ids']) < page_size:
+            break
+        offset += page_size
+
+    bump_generation()
+    print(f"Copied {copied} chunks from {COLLECTION_NAME} into {target.name} ({model})")
+    return copied
+
+if __name__ == "__main__":
+    adopt_legacy_collection()
+    print(f"Added attribute flags to {migrate_attribute_flags()} chunks")
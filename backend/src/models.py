@@ -1,8 +1,8 @@
 """
 Pydantic models for the Research Assistant API
 """
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Dict, Any
 
 class ChunkData(BaseModel):
     id: str
@@ -20,32 +20,73 @@ class ChunkData(BaseModel):
 class UploadRequest(BaseModel):
     chunks: List[ChunkData]
     schema_version: str = "1.0"
+    embedding_model: Optional[str] = None
 
 class SearchRequest(BaseModel):
     query: str
     k: int = 10
     min_score: float = 0.25
+    publish_year_min: Optional[int] = None
+    publish_year_max: Optional[int] = None
+    journals: Optional[List[str]] = None
+    attributes: Optional[List[str]] = None
+    mode: Literal["vector", "hybrid"] = "vector"
+    rerank: bool = False
+    rerank_top_n: int = Field(50, ge=1, le=500)
+    embedding_model: Optional[str] = None
+    quantized: Optional[bool] = None # None = QUANTIZED_SEARCH
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest] = Field(..., min_length=1, max_length=256)
 
 class SearchResult(BaseModel):
     id: str
     score: float
     text: str
     metadata: Dict[str, Any]
+    vector_score: Optional[float] = None
+    lexical_score: Optional[float] = None
+    rerank_score: Optional[float] = None
 
 class UploadResponse(BaseModel):
     message: str
     schema_version: str
+    job_id: Optional[str] = None
+
+class UploadJobStatus(BaseModel):
+    job_id: str
+    status: str
+    embedding_model: Optional[str] = None
+    total_chunks: Optional[int] = None
+    chunks_embedded: int
+    chunks_written: int
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failures: int
+    errors: List[str]
+    elapsed_seconds: float
+    chunks_per_second: float
 
 class SearchResponse(BaseModel):
     query: str
     results: List[SearchResult]
     total_found: int
+    timings: Optional[Dict[str, Any]] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
 
 class JournalResponse(BaseModel):
     journal_id: str
     chunks: List[Dict[str, Any]]
     total_chunks: int
+    next_cursor: Optional[str] = None
 
 class StatsResponse(BaseModel):
     total_chunks: int
     top_referenced_papers: List[Dict[str, Any]]
+    embedding_stats: Optional[Dict[str, Any]] = None
+    executor_stats: Optional[Dict[str, Any]] = None
+    result_cache_stats: Optional[Dict[str, Any]] = None
+    quantized_stats: Optional[Dict[str, Any]] = None
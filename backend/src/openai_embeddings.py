@@ -0,0 +1,137 @@
+"""
+Async OpenAI embedding client: pooled connections, batched inputs, bounded
+concurrency, token-bucket throttling and rate-limit-aware retries
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from .config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_BATCH_SIZE, OPENAI_MAX_CONCURRENCY,
+    OPENAI_MAX_RETRIES, OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE, OPENAI_TIMEOUT
+)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for throttling"""
+    return len(text) // 4 + 1
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second up to one minute's worth; 0 disables it"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited_seconds = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, amount: float):
+        if not self.rate:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+class AsyncOpenAIEmbedder:
+    """Runs an AsyncOpenAI client on a private event loop so sync callers can fan out requests"""
+
+    def __init__(self, model: str, base_url: Optional[str] = OPENAI_BASE_URL or None):
+        self.model = model
+        self.base_url = base_url
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._requests_bucket = TokenBucket(OPENAI_REQUESTS_PER_MINUTE)
+        self._tokens_bucket = TokenBucket(OPENAI_TOKENS_PER_MINUTE)
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                import httpx
+                from openai import AsyncOpenAI
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="openai-embeddings", daemon=True).start()
+                # Retries are handled here so they share the throttling state
+                self._client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY or "unused",
+                    base_url=self.base_url,
+                    max_retries=0,
+                    timeout=OPENAI_TIMEOUT,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=OPENAI_MAX_CONCURRENCY,
+                            max_keepalive_connections=OPENAI_MAX_CONCURRENCY
+                        ),
+                        timeout=OPENAI_TIMEOUT
+                    )
+                )
+                self._loop = loop
+        return self._loop
+
+    def _retry_after(self, error) -> float:
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                return float(response.headers.get("retry-after", ""))
+            except ValueError:
+                pass
+        return 0.0
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+        tokens = sum(estimate_tokens(text) for text in texts)
+
+        for attempt in range(OPENAI_MAX_RETRIES + 1):
+            await self._requests_bucket.acquire(1)
+            await self._tokens_bucket.acquire(tokens)
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    response = await self._client.embeddings.create(input=texts, model=self.model)
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as e:
+                if attempt == OPENAI_MAX_RETRIES:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                backoff = min(2 ** attempt, 60) * (0.5 + random.random() / 2)
+                await asyncio.sleep(max(backoff, self._retry_after(e)))
+
+    async def _embed_all(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+        return [embedding for batch in results for embedding in batch]
+
+    def embed(self, texts: List[str], batch_size: int = OPENAI_BATCH_SIZE) -> List[List[float]]:
+        """Embed texts with up to OPENAI_MAX_CONCURRENCY requests in flight; blocks the calling thread"""
+        loop = self._start()
+        return asyncio.run_coroutine_threadsafe(self._embed_all(texts, batch_size), loop).result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled_seconds": self._requests_bucket.waited_seconds + self._tokens_bucket.waited_seconds
+        }
@@ -0,0 +1,360 @@
+"""
+Int8 scalar-quantized vector tier: memory-lean first-pass search with exact rescoring
+
+The int8 codes stay in RAM (a quarter of float32). Full-precision vectors are
+kept in a flat float32 file that is memory-mapped, so rescoring only pages in
+the rows of the top candidates.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from .config import QUANTIZED_INDEX_PATH, QUANTIZED_RESCORE_FACTOR, QUANTIZED_REBUILD_DELAY
+from .database import get_collection
+from . import sync
+
+# Rows upcast to float32 at a time during the int8 scan
+_BLOCK_ROWS = 4096
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class QuantizedIndex:
+    """Per-dimension symmetric int8 quantization of unit-normalized vectors
+
+    Three append-only files hold the tier: float32 vectors (.f32), int8 codes
+    (.codes) and chunk ids, one JSON string per line (.ids). Rows are appended
+    to them in that order, so after a crash the shortest file gives the rows
+    written completely and the longer ones are cut back to it on load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.scales: Optional[np.ndarray] = None
+        self.codes = np.zeros((0, 0), dtype=np.int8)
+        self.count = 0
+        self._full: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+    @property
+    def dimensions(self) -> int:
+        return 0 if self.scales is None else len(self.scales)
+
+    def _full_path(self) -> str:
+        return f"{self.path}.f32"
+
+    def _files(self, suffix: str = "") -> Dict[str, str]:
+        return {
+            name: f"{self.path}.{name}{suffix}"
+            for name in ("f32", "codes", "ids", "scales.npy")
+        }
+
+    def _quantize(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scales * 127), -127, 127).astype(np.int8)
+
+    def _reserve(self, rows: int):
+        if rows <= len(self.codes):
+            return
+        grown = np.zeros((max(rows, 2 * len(self.codes), 1024), self.dimensions), dtype=np.int8)
+        grown[:self.count] = self.codes[:self.count]
+        self.codes = grown
+
+    def build(self, page_size: int = 5000):
+        """Quantize every vector in the default collection into fresh files, then swap them in"""
+        collection = get_collection()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self._files(".tmp")
+        scales = None
+        pages = []
+        offset = 0
+        # Two passes: the first finds per-dimension scales, the second writes codes
+        with open(tmp["f32"], "wb") as full:
+            while True:
+                page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+                if page['ids']:
+                    vectors = _normalize(np.asarray(page['embeddings'], dtype=np.float32))
+                    full.write(vectors.tobytes())
+                    peak = np.abs(vectors).max(axis=0)
+                    scales = peak if scales is None else np.maximum(scales, peak)
+                    pages.append(page['ids'])
+                if len(page['ids']) < page_size:
+                    break
+                offset += page_size
+        if scales is None:
+            os.remove(tmp["f32"])
+            return
+        scales[scales == 0] = 1.0
+
+        ids = [chunk_id for page_ids in pages for chunk_id in page_ids]
+        full = np.memmap(tmp["f32"], dtype=np.float32, mode="r", shape=(len(ids), len(scales)))
+        codes = np.zeros((len(ids), len(scales)), dtype=np.int8)
+        for start in range(0, len(ids), page_size):
+            block = full[start:start + page_size]
+            codes[start:start + len(block)] = np.clip(np.rint(block / scales * 127), -127, 127)
+        del full
+        codes.tofile(tmp["codes"])
+        with open(tmp["scales.npy"], "wb") as f:
+            np.save(f, scales)
+        with open(tmp["ids"], "w") as f:
+            f.writelines(json.dumps(chunk_id) + "\n" for chunk_id in ids)
+
+        live = self._files()
+        with self._lock:
+            # Without an ids file nothing loads, so a crash mid-swap leaves no mixed tier
+            if os.path.exists(live["ids"]):
+                os.remove(live["ids"])
+            for name in ("f32", "codes", "scales.npy", "ids"):
+                os.replace(tmp[name], live[name])
+            self.scales = scales
+            self.codes = codes
+            self.ids = ids
+            self.rows = {chunk_id: i for i, chunk_id in enumerate(ids)}
+            self.count = len(ids)
+            self._full = None
+
+    def _open_full(self, rows: int) -> np.memmap:
+        if self._full is None or len(self._full) < rows:
+            self._full = np.memmap(self._full_path(), dtype=np.float32, mode="r+", shape=(rows, self.dimensions))
+        return self._full
+
+    def add(self, ids: List[str], embeddings: List[List[float]]):
+        """Quantize newly written vectors with the existing scales, persisting them as they arrive"""
+        with self._lock:
+            if self.scales is None:
+                return
+            vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+            codes = self._quantize(vectors)
+            files = self._files()
+            # A repeated id within the batch keeps its last vector
+            appended: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+            for chunk_id, vector, code in zip(ids, vectors, codes):
+                row = self.rows.get(chunk_id)
+                if row is None:
+                    appended[chunk_id] = (vector, code)
+                else:
+                    self.codes[row] = code
+                    self._open_full(self.count)[row] = vector
+                    with open(files["codes"], "r+b") as f:
+                        f.seek(row * self.dimensions)
+                        f.write(code.tobytes())
+            if not appended:
+                return
+
+            with open(files["f32"], "ab") as f:
+                f.write(b"".join(vector.tobytes() for vector, _ in appended.values()))
+            with open(files["codes"], "ab") as f:
+                f.write(b"".join(code.tobytes() for _, code in appended.values()))
+            with open(files["ids"], "a") as f:
+                f.writelines(json.dumps(chunk_id) + "\n" for chunk_id in appended)
+
+            self._reserve(self.count + len(appended))
+            for chunk_id, (_, code) in appended.items():
+                self.codes[self.count] = code
+                self.rows[chunk_id] = self.count
+                self.ids.append(chunk_id)
+                self.count += 1
+            self._full = None
+
+    def search(self, embedding: List[float], k: int, rescore: int) -> List[Tuple[str, float]]:
+        """Approximate int8 scan for rescore candidates, then exact cosine on the full vectors"""
+        with self._lock:
+            count, codes, scales, ids = self.count, self.codes, self.scales, self.ids
+            full = self._open_full(count) if count else None
+        if not count:
+            return []
+
+        query = _normalize(np.asarray([embedding], dtype=np.float32))[0]
+        weights = query * scales / 127
+        approx = np.empty(count, dtype=np.float32)
+        for start in range(0, count, _BLOCK_ROWS):
+            block = codes[start:min(start + _BLOCK_ROWS, count)]
+            approx[start:start + len(block)] = block.astype(np.float32) @ weights
+
+        rescore = min(max(rescore, k), count)
+        candidates = np.argpartition(-approx, rescore - 1)[:rescore]
+        # Sorted row order keeps the memory-mapped reads sequential
+        candidates.sort()
+        exact = full[candidates] @ query
+        order = np.argsort(-exact)[:k]
+        return [(ids[candidates[i]], float(exact[i])) for i in order]
+
+    def load(self) -> bool:
+        """Load the files, cutting them back to the rows all three hold completely"""
+        files = self._files()
+        if not all(os.path.exists(path) for path in files.values()):
+            return False
+        scales = np.load(files["scales.npy"])
+        with open(files["ids"], "rb") as f:
+            lines = f.read().split(b"\n")
+        # The last element is whatever followed the final newline: empty or a torn line
+        ids = [json.loads(line) for line in lines[:-1]]
+        dimensions = len(scales)
+        count = min(
+            len(ids),
+            os.path.getsize(files["f32"]) // (4 * dimensions),
+            os.path.getsize(files["codes"]) // dimensions
+        )
+        os.truncate(files["f32"], count * dimensions * 4)
+        os.truncate(files["codes"], count * dimensions)
+        if len(ids) != count or lines[-1]:
+            ids = ids[:count]
+            with open(files["ids"], "w") as f:
+                f.writelines(json.dumps(chunk_id) + "\n" for chunk_id in ids)
+
+        self.scales = scales
+        self.codes = np.fromfile(files["codes"], dtype=np.int8).reshape(count, dimensions)
+        self.ids = ids
+        self.rows = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self.count = count
+        self._full = None
+        return True
+
+    def memory_stats(self) -> Dict[str, Any]:
+        code_bytes = self.count * self.dimensions
+        return {
+            "vectors": self.count,
+            "dimensions": self.dimensions,
+            "int8_bytes": code_bytes,
+            "float32_bytes": code_bytes * 4,
+            "compression_ratio": 4.0 if code_bytes else None
+        }
+
+quantized_index = QuantizedIndex(QUANTIZED_INDEX_PATH)
+_loaded = False
+_stale = False
+# Shared by every worker and kept across restarts: the tier on disk is missing writes
+STALE_MARKER = f"{QUANTIZED_INDEX_PATH}.stale"
+_rebuild_requested = threading.Event()
+_rebuilder: Optional[threading.Thread] = None
+_rebuilder_lock = threading.Lock()
+
+def _load():
+    global _stale
+    with sync.process_lock("quantized"):
+        if not quantized_index.load():
+            return
+    stored = get_collection().count()
+    if os.path.exists(STALE_MARKER):
+        print("Quantized tier is marked stale; serving full-precision search until it is rebuilt")
+        _stale = True
+        _schedule_rebuild()
+    elif quantized_index.count != stored:
+        print(
+            f"Quantized tier holds {quantized_index.count} vectors but the collection has {stored}; "
+            f"serving full-precision search until it is rebuilt"
+        )
+        invalidate()
+
+def is_ready() -> bool:
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        _load()
+    return quantized_index.count > 0 and not _stale
+
+def invalidate():
+    """Stop serving from the tier until it is rebuilt, e.g. after another worker wrote chunks"""
+    global _stale
+    _stale = True
+    if quantized_index.count:
+        with open(STALE_MARKER, "w"):
+            pass
+        _schedule_rebuild()
+
+def build():
+    """(Re)build the tier from the default collection"""
+    global _loaded, _stale
+    with sync.process_lock("quantized"):
+        # Removed first: a write during the build marks the new tier stale again
+        if os.path.exists(STALE_MARKER):
+            os.remove(STALE_MARKER)
+        quantized_index.build()
+    _loaded = True
+    _stale = os.path.exists(STALE_MARKER)
+
+def _rebuild():
+    """Rebuild a stale tier, or reload it if another worker already has"""
+    global _stale
+    if not os.path.exists(STALE_MARKER):
+        with sync.process_lock("quantized"):
+            quantized_index.load()
+        _stale = quantized_index.count != get_collection().count()
+        if _stale:
+            invalidate()
+        return
+    build()
+    print(f"Rebuilt quantized tier with {quantized_index.count} vectors")
+    if _stale:
+        _schedule_rebuild()
+
+def _schedule_rebuild():
+    global _rebuilder
+    _rebuild_requested.set()
+    with _rebuilder_lock:
+        if _rebuilder is None:
+            _rebuilder = threading.Thread(target=_run_rebuilder, name="quantized-rebuilder", daemon=True)
+            _rebuilder.start()
+
+def _run_rebuilder():
+    while True:
+        _rebuild_requested.wait()
+        # Let a burst of writes finish before paying for a rebuild
+        time.sleep(QUANTIZED_REBUILD_DELAY)
+        _rebuild_requested.clear()
+        try:
+            _rebuild()
+        except Exception as e:
+            print(f"Quantized tier rebuild failed, retrying: {e}")
+            _rebuild_requested.set()
+
+def search(embedding: List[float], k: int) -> List[Tuple[str, float]]:
+    """Top k (chunk_id, cosine similarity) pairs after exact rescoring"""
+    return quantized_index.search(embedding, k, k * QUANTIZED_RESCORE_FACTOR)
+
+def add(ids: List[str], embeddings: List[List[float]]):
+    """Keep a built tier in step with newly written chunks"""
+    if not is_ready():
+        if quantized_index.count:
+            # Marked again so a rebuild already reading the collection is followed by another
+            invalidate()
+        return
+    if sync.ENABLED:
+        # The on-disk tier is shared by all workers, so none of them may append to it
+        invalidate()
+    else:
+        quantized_index.add(ids, embeddings)
+
+def evaluate_recall(k: int = 10, samples: int = 50) -> Dict[str, Any]:
+    """Compare quantized+rescore results with the full-precision HNSW search, using stored vectors as queries"""
+    if not is_ready():
+        raise RuntimeError("Quantized index has not been built")
+
+    rng = np.random.default_rng(0)
+    picks = rng.choice(quantized_index.count, size=min(samples, quantized_index.count), replace=False)
+    queries = np.asarray(quantized_index._open_full(quantized_index.count)[np.sort(picks)])
+
+    exact = get_collection().query(query_embeddings=queries.tolist(), n_results=k, include=["distances"])
+    recalls, quantized_ms = [], []
+    for query, truth in zip(queries, exact['ids']):
+        start = time.perf_counter()
+        found = {chunk_id for chunk_id, _ in search(query.tolist(), k)}
+        quantized_ms.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(found & set(truth)) / max(len(truth), 1))
+
+    return {
+        f"recall@{k}": float(np.mean(recalls)),
+        "samples": len(recalls),
+        "rescore_candidates": k * QUANTIZED_RESCORE_FACTOR,
+        "avg_search_ms": float(np.mean(quantized_ms)),
+        **quantized_index.memory_stats()
+    }
+
+if __name__ == "__main__":
+    build()
+    print(json.dumps(evaluate_recall(), indent=2))
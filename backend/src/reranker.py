@@ -0,0 +1,58 @@
+"""
+Second-stage cross-encoder re-ranking of search candidates under a latency budget
+"""
+import threading
+import time
+from typing import Dict, Any, List, Tuple
+from .config import RERANK_MODEL, RERANK_BATCH_SIZE, RERANK_BUDGET_MS
+from .models import SearchResult
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_reranker():
+    """Return the shared cross-encoder, loading it on first use"""
+    global _model
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import CrossEncoder
+            start = time.perf_counter()
+            _model = CrossEncoder(RERANK_MODEL)
+            print(f"Loaded re-ranker {RERANK_MODEL} in {time.perf_counter() - start:.2f}s")
+    return _model
+
+def rerank(
+    query: str,
+    candidates: List[SearchResult],
+    budget_ms: float = RERANK_BUDGET_MS,
+    batch_size: int = RERANK_BATCH_SIZE
+) -> Tuple[List[SearchResult], Dict[str, Any]]:
+    """Score candidates in batches until the budget runs out; unscored ones keep their order after the scored ones"""
+    model = get_reranker()
+    start = time.perf_counter()
+    scored: List[Tuple[float, SearchResult]] = []
+    budget_exhausted = False
+
+    for offset in range(0, len(candidates), batch_size):
+        if (time.perf_counter() - start) * 1000 > budget_ms:
+            budget_exhausted = True
+            break
+        batch = candidates[offset:offset + batch_size]
+        scores = model.predict([(query, hit.text) for hit in batch])
+        scored.extend(zip((float(score) for score in scores), batch))
+
+    # Cross-encoder logits are on their own scale, so score keeps the retrieval
+    # score and an unscored tail is told apart by its missing rerank_score
+    scored.sort(key=lambda item: item[0], reverse=True)
+    reranked = [hit.model_copy(update={"rerank_score": score}) for score, hit in scored]
+    reranked += candidates[len(scored):]
+
+    return reranked, {
+        "rerank_ms": (time.perf_counter() - start) * 1000,
+        "reranked": len(scored),
+        "candidates": len(candidates),
+        "budget_exhausted": budget_exhausted
+    }
@@ -0,0 +1,16 @@
+"""
+Lean JSON responses that bypass FastAPI's response_model re-validation
+"""
+from fastapi import Response
+from pydantic import BaseModel
+from .metrics import stage
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialize a model once with pydantic-core instead of dump, validate and encode"""
+    with stage("serialize"):
+        content = model.model_dump_json()
+    return Response(
+        content=content,
+        media_type="application/json",
+        status_code=status_code
+    )
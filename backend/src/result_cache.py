@@ -0,0 +1,59 @@
+"""
+Similarity search result cache, invalidated by the collection generation counter
+"""
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from .config import RESULT_CACHE_SIZE
+
+def result_key(embedding: List[float], *params) -> str:
+    """Hash a query embedding together with the search parameters"""
+    digest = hashlib.sha1(array('f', embedding).tobytes())
+    digest.update(repr(params).encode("utf-8"))
+    return digest.hexdigest()
+
+class ResultCache:
+    """LRU of search results tagged with the generation they were computed at"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, generation: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, generation: int, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None
+            }
+
+result_cache = ResultCache(RESULT_CACHE_SIZE)
@@ -0,0 +1,24 @@
+"""
+Liveness and readiness probes for the Research Assistant API
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from .. import lifecycle
+
+router = APIRouter()
+
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving HTTP; 503 once startup has given up, so it gets restarted"""
+    status = lifecycle.status()
+    if lifecycle.has_failed():
+        return JSONResponse(
+            {"status": "failed", "error": status["error"], "uptime_seconds": status["uptime_seconds"]},
+            status_code=503
+        )
+    return {"status": "alive", "uptime_seconds": status["uptime_seconds"]}
+
+@router.get("/health/ready")
+async def readiness():
+    """Store opened, indexes built and warm-up done; 503 until then"""
+    return JSONResponse(lifecycle.status(), status_code=200 if lifecycle.is_ready() else 503)
@@ -1,38 +1,127 @@
 """
 Journal routes for the Research Assistant API
 """
-from fastapi import APIRouter, HTTPException
+import json
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from ..config import JOURNAL_STREAM_PAGE_SIZE
 from ..models import JournalResponse
-from ..database import collection
+from ..database import get_collection
+from ..executor import run_in_pool
+from ..metrics import stage
+from ..responses import model_response
+from .. import metadata_index
 
 router = APIRouter()
 
+def _parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, Optional[str]]]:
+    """Split a "<chunk_index>:<id>" cursor; a bare chunk_index skips past that whole index"""
+    if cursor is None:
+        return None
+    chunk_index, separator, chunk_id = cursor.partition(":")
+    try:
+        return int(chunk_index), chunk_id if separator else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+def _chunk_ids(journal_id: str, cursor: Optional[str], limit: Optional[int] = None) -> Tuple[List[tuple], int]:
+    """(id, chunk_index) pairs after the cursor and the document's chunk count, from the secondary index"""
+    total = metadata_index.count_chunks_for_document(journal_id)
+    if not total:
+        raise HTTPException(status_code=404, detail="Journal not found")
+    return metadata_index.chunk_ids_for_document(journal_id, after=_parse_cursor(cursor), limit=limit), total
+
+def _load_chunks(chunk_ids: List[str], include_text: bool) -> List[Dict[str, Any]]:
+    """Fetch chunks by id, keeping the order of chunk_ids"""
+    if not chunk_ids:
+        return []
+    include = ["documents", "metadatas"] if include_text else ["metadatas"]
+    with stage("journal_fetch"):
+        results = get_collection().get(ids=chunk_ids, include=include)
+
+    by_id = {}
+    for i, chunk_id in enumerate(results['ids']):
+        chunk = {"id": chunk_id, "metadata": results['metadatas'][i]}
+        if include_text:
+            chunk["text"] = results['documents'][i]
+        by_id[chunk_id] = chunk
+    return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
+
+def _get_journal(
+    journal_id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_text: bool = True
+) -> JournalResponse:
+    """Fetch one page of chunks stored for a source document"""
+    ids, total = _chunk_ids(journal_id, cursor, limit + 1 if limit else None)
+    page = ids[:limit] if limit else ids
+    next_cursor = None
+    if limit and len(ids) > limit:
+        last_id, last_index = page[-1]
+        next_cursor = f"{last_index}:{last_id}"
+
+    chunks = _load_chunks([chunk_id for chunk_id, _ in page], include_text)
+
+    return JournalResponse.model_construct(
+        journal_id=journal_id,
+        chunks=chunks,
+        total_chunks=total,
+        next_cursor=next_cursor
+    )
+
+def _stream_journal(journal_id: str, chunk_ids: List[str], total: int, include_text: bool) -> Iterator[str]:
+    """Yield a JournalResponse document page by page as chunks are read"""
+    yield f'{{"journal_id": {json.dumps(journal_id)}, "chunks": ['
+    separator = ""
+    for start in range(0, len(chunk_ids), JOURNAL_STREAM_PAGE_SIZE):
+        chunks = _load_chunks(chunk_ids[start:start + JOURNAL_STREAM_PAGE_SIZE], include_text)
+        # Chunks removed from the store since the ids were read leave a page empty
+        if not chunks:
+            continue
+        yield separator + ", ".join(json.dumps(chunk) for chunk in chunks)
+        separator = ", "
+    yield f'], "total_chunks": {total}, "next_cursor": null}}'
+
+@router.get("/index/documents")
+async def list_documents(
+    journal: Optional[str] = None,
+    publish_year: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    offset: int = Query(0, ge=0)
+):
+    """List indexed documents, optionally filtered by journal or publish year"""
+    try:
+        return await run_in_pool(metadata_index.list_documents, journal, publish_year, limit, offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/index/journals")
+async def list_journals():
+    """List journals with document and chunk counts"""
+    try:
+        return await run_in_pool(metadata_index.list_journals)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{journal_id}", response_model=JournalResponse)
-async def get_journal(journal_id: str):
-    """Get all chunks for a specific journal document"""
+async def get_journal(
+    journal_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    include_text: bool = Query(True, description="Set false to return only chunk metadata"),
+    stream: bool = Query(False, description="Stream the response as chunks are read")
+):
+    """Get chunks for a specific journal document, optionally paginated or streamed"""
     try:
-        results = collection.get(
-            where={"source_doc_id": journal_id},
-            include=["documents", "metadatas"]
-        )
-        
-        if not results['ids']:
-            raise HTTPException(status_code=404, detail="Journal not found")
-        
-        chunks = []
-        for i in range(len(results['ids'])):
-            chunks.append({
-                "id": results['ids'][i],
-                "text": results['documents'][i],
-                "metadata": results['metadatas'][i]
-            })
-        
-        return JournalResponse(
-            journal_id=journal_id,
-            chunks=chunks,
-            total_chunks=len(chunks)
-        )
-    
+        if stream:
+            ids, total = await run_in_pool(_chunk_ids, journal_id, cursor)
+            return StreamingResponse(
+                _stream_journal(journal_id, [chunk_id for chunk_id, _ in ids], total, include_text),
+                media_type="application/json"
+            )
+        return model_response(await run_in_pool(_get_journal, journal_id, cursor, limit, include_text))
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,49 @@
+"""
+Prometheus metrics endpoint for the Research Assistant API
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from .. import metrics, usage
+from ..database import get_collection
+from ..embedding_cache import embedding_cache
+from ..embeddings import providers
+from ..executor import run_in_pool, get_executor_stats
+from ..jobs import queue_depth
+from ..result_cache import result_cache
+
+router = APIRouter()
+
+def _cache_values(stats: dict) -> dict:
+    return {key: stats.get(key) for key in ("size", "hits", "misses", "hit_rate")}
+
+metrics.register(metrics.Gauges(
+    "collection_chunks", "Chunks stored in the default collection", "",
+    lambda: {"": get_collection().count()}
+))
+metrics.register(metrics.Gauges(
+    "embedding_cache", "Embedding cache size, hits, misses and hit rate", "field",
+    lambda: _cache_values(embedding_cache.stats())
+))
+metrics.register(metrics.Gauges(
+    "result_cache", "Search result cache size, hits, misses and hit rate", "field",
+    lambda: _cache_values(result_cache.stats())
+))
+metrics.register(metrics.Gauges(
+    "embedding_encode_calls_total", "Model encode calls per embedding model", "model",
+    lambda: {name: provider.encode_calls for name, provider in providers.items()},
+    kind="counter"
+))
+metrics.register(metrics.Gauges(
+    "work_pool", "Work pool queue depth and concurrency", "field",
+    get_executor_stats
+))
+metrics.register(metrics.Gauges(
+    "backlog", "Queued ingest jobs and unflushed usage increments", "queue",
+    lambda: {"ingest_jobs": queue_depth(), "usage_increments": len(usage.pending_counts())}
+))
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of histograms and current gauges"""
+    body = await run_in_pool(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -1,51 +1,232 @@
 """
 Search routes for the Research Assistant API
 """
+import json
+import time
+from typing import Dict, Any, List, Optional
+import numpy as np
 from fastapi import APIRouter, HTTPException
-from ..models import SearchRequest, SearchResponse, SearchResult
-from ..database import collection
-from ..embeddings import generate_embedding
+from ..models import (
+    SearchRequest, SearchResponse, SearchResult, BatchSearchRequest, BatchSearchResponse
+)
+from ..config import HYBRID_CANDIDATE_FACTOR, RRF_K, QUANTIZED_SEARCH
+from .. import bm25, database, quantized
+from ..database import get_collection
+from ..embeddings import generate_embeddings, get_provider, DEFAULT_EMBEDDING_MODEL
+from ..ingest import attribute_key
+from ..executor import run_in_pool
+from ..metrics import stage
+from ..responses import model_response
+from ..usage import record_hits
+from ..result_cache import result_cache, result_key
+from ..reranker import rerank
 
 router = APIRouter()
 
-@router.post("/similarity_search", response_model=SearchResponse)
-async def similarity_search(request: SearchRequest):
-    """Perform semantic similarity search"""
-    try:
-        query_embedding = generate_embedding(request.query)
+def _build_results(results: Dict[str, Any], row: int, k: int, min_score: float) -> List[SearchResult]:
+    """Turn one row of a collection.query result into scored hits above min_score"""
+    scores = 1 - np.asarray(results['distances'][row][:k], dtype=np.float64)
+    keep = np.flatnonzero(scores >= min_score)
+    if not len(keep):
+        return []
+
+    # Values come straight from the store, so skip per-item validation
+    ids, documents, metadatas = results['ids'][row], results['documents'][row], results['metadatas'][row]
+    return [
+        SearchResult.model_construct(id=ids[i], score=score, text=documents[i], metadata=metadatas[i])
+        for i, score in zip(keep.tolist(), scores[keep].tolist())
+    ]
+
+def build_where(request: SearchRequest) -> Optional[Dict[str, Any]]:
+    """Translate the request's filter fields into a ChromaDB where clause"""
+    clauses = []
+    if request.publish_year_min is not None:
+        clauses.append({"publish_year": {"$gte": request.publish_year_min}})
+    if request.publish_year_max is not None:
+        clauses.append({"publish_year": {"$lte": request.publish_year_max}})
+    if request.journals:
+        clauses.append({"journal": {"$in": request.journals}})
+    if request.attributes:
+        attribute_clauses = [{attribute_key(attribute): True} for attribute in request.attributes]
+        clauses.append(attribute_clauses[0] if len(attribute_clauses) == 1 else {"$or": attribute_clauses})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def _pool_size(request: SearchRequest) -> int:
+    """Results kept after retrieval; re-ranking widens the pool to rerank_top_n"""
+    return max(request.k, request.rerank_top_n) if request.rerank else request.k
+
+def _candidates(request: SearchRequest) -> int:
+    """Hybrid search over-fetches so fusion has candidates from both retrievers"""
+    pool = _pool_size(request)
+    return pool * HYBRID_CANDIDATE_FACTOR if request.mode == "hybrid" else pool
+
+def _use_quantized(request: SearchRequest, model: str, where: Optional[Dict[str, Any]]) -> bool:
+    """The int8 tier covers the default collection without filters; anything else goes to HNSW"""
+    wanted = QUANTIZED_SEARCH if request.quantized is None else request.quantized
+    return wanted and model == DEFAULT_EMBEDDING_MODEL and where is None and quantized.is_ready()
+
+def _query_quantized(embeddings: List[List[float]], n_results: int) -> Dict[str, Any]:
+    """Search the int8 tier and shape the hits like a collection.query result"""
+    rows = [quantized.search(embedding, n_results) for embedding in embeddings]
+    ids = list({chunk_id for row in rows for chunk_id, _ in row})
+    stored = get_collection().get(ids=ids, include=["documents", "metadatas"])
+    by_id = {
+        chunk_id: (text, metadata)
+        for chunk_id, text, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+    }
+    rows = [[(chunk_id, score) for chunk_id, score in row if chunk_id in by_id] for row in rows]
+    return {
+        "ids": [[chunk_id for chunk_id, _ in row] for row in rows],
+        "documents": [[by_id[chunk_id][0] for chunk_id, _ in row] for row in rows],
+        "metadatas": [[by_id[chunk_id][1] for chunk_id, _ in row] for row in rows],
+        "distances": [[1 - score for _, score in row] for row in rows]
+    }
+
+def _fuse(
+    request: SearchRequest,
+    vector_hits: List[SearchResult],
+    where: Optional[Dict[str, Any]],
+    model: str
+) -> List[SearchResult]:
+    """Combine vector and BM25 rankings with reciprocal rank fusion"""
+    lexical = bm25.search(request.query, _candidates(request))
+
+    fused: Dict[str, float] = {}
+    for rank, hit in enumerate(vector_hits):
+        fused[hit.id] = fused.get(hit.id, 0.0) + 1 / (RRF_K + rank + 1)
+    for rank, (chunk_id, _) in enumerate(lexical):
+        fused[chunk_id] = fused.get(chunk_id, 0.0) + 1 / (RRF_K + rank + 1)
+
+    by_id = {hit.id: hit for hit in vector_hits}
+    lexical_scores = dict(lexical)
+    lexical_only = [chunk_id for chunk_id, _ in lexical if chunk_id not in by_id]
+    if lexical_only:
+        stored = get_collection(model).get(ids=lexical_only, where=where, include=["documents", "metadatas"])
+        for chunk_id, text, metadata in zip(stored['ids'], stored['documents'], stored['metadatas']):
+            by_id[chunk_id] = SearchResult.model_construct(id=chunk_id, score=0.0, text=text, metadata=metadata)
+
+    ranked = sorted((chunk_id for chunk_id in fused if chunk_id in by_id), key=fused.get, reverse=True)
+    return [
+        SearchResult.model_construct(
+            id=chunk_id,
+            score=fused[chunk_id],
+            text=by_id[chunk_id].text,
+            metadata=by_id[chunk_id].metadata,
+            vector_score=by_id[chunk_id].score if chunk_id not in lexical_only else None,
+            lexical_score=lexical_scores.get(chunk_id)
+        )
+        for chunk_id in ranked[:_pool_size(request)]
+    ]
 
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=request.k,
-            include=["documents", "metadatas", "distances"]
+def _search_many(requests: List[SearchRequest]) -> List[SearchResponse]:
+    """Embed all queries in one batch and run one multi-vector query for cache misses"""
+    models = [get_provider(request.embedding_model).name for request in requests]
+
+    start = time.perf_counter()
+    embeddings: List[Optional[List[float]]] = [None] * len(requests)
+    for model in set(models):
+        indices = [i for i, name in enumerate(models) if name == model]
+        encoded = generate_embeddings([requests[i].query for i in indices], model=model)
+        for i, embedding in zip(indices, encoded):
+            embeddings[i] = embedding
+    embed_ms = (time.perf_counter() - start) * 1000
+
+    generation = database.collection_generation
+    wheres = [build_where(request) for request in requests]
+    tiers = [_use_quantized(request, model, where) for request, model, where in zip(requests, models, wheres)]
+    keys = [
+        result_key(
+            embedding, model, request.k, request.min_score, request.mode,
+            request.rerank and request.rerank_top_n, json.dumps(where, sort_keys=True), tier
         )
+        for request, embedding, where, model, tier in zip(requests, embeddings, wheres, models, tiers)
+    ]
+    all_results = [result_cache.get(key, generation) for key in keys]
+    timings = [
+        {"embed_ms": embed_ms, "cache_hit": cached is not None} for cached in all_results
+    ]
 
-        search_results = []
-        for i in range(len(results['ids'][0])):
-            score = 1 - results['distances'][0][i]
-            
-            if score >= request.min_score:
-                chunk_id = results['ids'][0][i]
-                metadata = results['metadatas'][0][i]
-                current_usage = metadata.get('usage_count', 0)
-                
-                collection.update(
-                    ids=[chunk_id],
-                    metadatas=[{**metadata, 'usage_count': current_usage + 1}]
+    # Queries sharing a model, filter and tier run together as one multi-vector query
+    groups: Dict[tuple, List[int]] = {}
+    for i, cached in enumerate(all_results):
+        if cached is None:
+            groups.setdefault((models[i], json.dumps(wheres[i], sort_keys=True), tiers[i]), []).append(i)
+
+    for (model, _, tier), missing in groups.items():
+        start = time.perf_counter()
+        n_results = max(_candidates(requests[i]) for i in missing)
+        with stage("vector_query"):
+            if tier:
+                results = _query_quantized([embeddings[i] for i in missing], n_results)
+            else:
+                results = get_collection(model).query(
+                    query_embeddings=[embeddings[i] for i in missing],
+                    n_results=n_results,
+                    where=wheres[missing[0]],
+                    include=["documents", "metadatas", "distances"]
                 )
-                
-                search_results.append(SearchResult(
-                    id=chunk_id,
-                    score=score,
-                    text=results['documents'][0][i],
-                    metadata=metadata
-                ))
-        
-        return SearchResponse(
+        query_ms = (time.perf_counter() - start) * 1000
+
+        for row, i in enumerate(missing):
+            request = requests[i]
+            timings[i]["query_ms"] = query_ms
+            timings[i]["quantized"] = tier
+            all_results[i] = _build_results(results, row, _candidates(request), request.min_score)
+            if request.mode == "hybrid":
+                start = time.perf_counter()
+                with stage("fuse"):
+                    all_results[i] = _fuse(request, all_results[i], wheres[i], model)
+                timings[i]["fuse_ms"] = (time.perf_counter() - start) * 1000
+            if request.rerank:
+                with stage("rerank"):
+                    all_results[i], rerank_timings = rerank(request.query, all_results[i])
+                timings[i].update(rerank_timings)
+            all_results[i] = all_results[i][:request.k]
+            result_cache.put(keys[i], generation, all_results[i])
+
+    with stage("record_usage"):
+        for model in set(models):
+            hits = [
+                result
+                for search_results, name in zip(all_results, models) if name == model
+                for result in search_results
+            ]
+            record_hits([result.id for result in hits], [result.metadata for result in hits], model)
+
+    return [
+        SearchResponse.model_construct(
             query=request.query,
             results=search_results,
-            total_found=len(search_results)
+            total_found=len(search_results),
+            timings=timing if request.rerank else None
         )
-    
+        for request, search_results, timing in zip(requests, all_results, timings)
+    ]
+
+def _similarity_search(request: SearchRequest) -> SearchResponse:
+    """Embed the query, search the collection and record usage"""
+    return _search_many([request])[0]
+
+@router.post("/similarity_search", response_model=SearchResponse)
+async def similarity_search(request: SearchRequest):
+    """Perform semantic similarity search"""
+    try:
+        return model_response(await run_in_pool(_similarity_search, request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/similarity_search/batch", response_model=BatchSearchResponse)
+async def batch_similarity_search(request: BatchSearchRequest):
+    """Perform semantic similarity search for many queries in one call"""
+    try:
+        results = await run_in_pool(_search_many, request.queries)
+        return model_response(BatchSearchResponse.model_construct(results=results))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
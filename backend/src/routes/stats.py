@@ -1,49 +1,41 @@
 """
 Statistics routes for the Research Assistant API
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from ..models import StatsResponse
-from ..database import collection
+from ..database import get_collection
+from ..embeddings import get_embedding_stats
+from ..executor import run_in_pool, get_executor_stats
+from .. import aggregates, quantized
+from ..result_cache import result_cache
 
 router = APIRouter()
 
+def _get_stats() -> StatsResponse:
+    """Read chunk count and the maintained top-document index"""
+    return StatsResponse(
+        total_chunks=get_collection().count(),
+        top_referenced_papers=aggregates.top_documents(10),
+        embedding_stats=get_embedding_stats(),
+        executor_stats=get_executor_stats(),
+        result_cache_stats=result_cache.stats(),
+        quantized_stats=quantized.quantized_index.memory_stats() if quantized.is_ready() else None
+    )
+
+@router.get("/stats/quantized")
+async def get_quantized_stats(k: int = Query(10, ge=1, le=100), samples: int = Query(50, ge=1, le=1000)):
+    """Memory use and recall@k of the int8 tier against full-precision search"""
+    if not quantized.is_ready():
+        raise HTTPException(status_code=409, detail="Quantized index has not been built; run `just quantize`")
+    try:
+        return await run_in_pool(quantized.evaluate_recall, k, samples)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/stats", response_model=StatsResponse)
 async def get_stats():
     """Get system statistics"""
     try:
-        collection_count = collection.count()
-
-        all_results = collection.get(include=["metadatas"])
-        usage_stats = {}
-        
-        for metadata in all_results['metadatas']:
-            doc_id = metadata['source_doc_id']
-            usage_count = metadata.get('usage_count', 0)
-            
-            if doc_id not in usage_stats:
-                usage_stats[doc_id] = {
-                    'journal': metadata.get('journal', 'Unknown'),
-                    'total_usage': 0
-                }
-            usage_stats[doc_id]['total_usage'] += usage_count
-
-        top_papers = sorted(
-            usage_stats.items(), 
-            key=lambda x: x[1]['total_usage'], 
-            reverse=True
-        )[:10]
-        
-        return StatsResponse(
-            total_chunks=collection_count,
-            top_referenced_papers=[
-                {
-                    "source_doc_id": doc_id,
-                    "journal": stats['journal'],
-                    "total_usage": stats['total_usage']
-                }
-                for doc_id, stats in top_papers
-            ]
-        )
-    
+        return await run_in_pool(_get_stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
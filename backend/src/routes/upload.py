@@ -1,46 +1,123 @@
 """
 Upload routes for the Research Assistant API
 """
-import json
-from fastapi import APIRouter, HTTPException
-from ..models import UploadRequest, UploadResponse
-from ..database import collection
-from ..embeddings import generate_embedding
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import ValidationError
+from ..config import UPLOAD_BATCH_SIZE, STREAM_MAX_LINE_BYTES
+from ..models import ChunkData, UploadRequest, UploadResponse, UploadJobStatus
+from ..jobs import submit_job, create_stream_job, get_job_status, QueueFullError
+from ..executor import run_in_pool
+from ..embeddings import get_provider
 
 router = APIRouter()
 
 @router.put("/upload", status_code=202, response_model=UploadResponse)
-async def upload_chunks(request: UploadRequest):
-    """Upload and embed journal chunks"""
+async def upload_chunks(
+    request: UploadRequest,
+    batch_size: Optional[int] = Query(None, ge=1, le=4096)
+):
+    """Queue journal chunks for background embedding and storage"""
     try:
         chunk_count = len(request.chunks)
-        
-        for chunk in request.chunks:
-            embedding = generate_embedding(chunk.text)
-            
-            metadata = {
-                "source_doc_id": chunk.source_doc_id,
-                "chunk_index": chunk.chunk_index,
-                "section_heading": chunk.section_heading,
-                "doi": chunk.doi or "",
-                "journal": chunk.journal,
-                "publish_year": chunk.publish_year,
-                "usage_count": chunk.usage_count,
-                "attributes": json.dumps(chunk.attributes),
-                "link": chunk.link
-            }
-            
-            collection.add(
-                ids=[chunk.id],
-                embeddings=[embedding],
-                documents=[chunk.text],
-                metadatas=[metadata]
-            )
-        
+        model = get_provider(request.embedding_model).name
+        job = submit_job(
+            request.chunks,
+            batch_size=batch_size or UPLOAD_BATCH_SIZE,
+            total_chunks=chunk_count,
+            model=model
+        )
+
         return UploadResponse(
-            message=f"Successfully uploaded {chunk_count} chunks",
-            schema_version=request.schema_version
+            message=f"Accepted {chunk_count} chunks for ingest",
+            schema_version=request.schema_version,
+            job_id=job.id
         )
-    
+
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/upload/stream", response_model=UploadJobStatus)
+async def upload_stream(
+    request: Request,
+    batch_size: Optional[int] = Query(None, ge=1, le=4096),
+    embedding_model: Optional[str] = None
+):
+    """Ingest newline-delimited ChunkData records as they arrive"""
+    model = get_provider(embedding_model).name
+    job = create_stream_job(batch_size or UPLOAD_BATCH_SIZE, model)
+    buffer = b""
+    batch = []
+    line_number = 0
+    in_flight = None
+
+    async def flush(batch):
+        # Keep one batch embedding while the next is parsed; awaiting it
+        # before submitting another applies backpressure to the client
+        nonlocal in_flight
+        if in_flight is not None:
+            await in_flight
+        in_flight = asyncio.ensure_future(run_in_pool(job.process_batch, batch))
+
+    async def abandon(batch, error: str):
+        # The batch in the pool still updates the job's counts, so it has to
+        # land before the job is published as finished; parsed chunks that
+        # were never submitted count as failed
+        if in_flight is not None:
+            await asyncio.wait([in_flight])
+        if batch:
+            job.record_failure(len(batch), "stream ended before the batch was written")
+        job.record_failure(0, error)
+        job.finish()
+
+    def parse(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return
+        try:
+            batch.append(ChunkData.model_validate_json(line))
+        except ValidationError as e:
+            job.record_failure(1, f"line {line_number}: {e.errors()[0]['msg']}")
+
+    try:
+        async for piece in request.stream():
+            buffer += piece
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                parse(line)
+                if len(batch) >= job.batch_size:
+                    await flush(batch)
+                    batch = []
+            if len(buffer) > STREAM_MAX_LINE_BYTES:
+                raise HTTPException(status_code=413, detail=f"Line {line_number + 1} is too long")
+
+        parse(buffer)
+        if batch:
+            await flush(batch)
+            batch = []
+        if in_flight is not None:
+            await in_flight
+
+        job.finish()
+        return UploadJobStatus(**job.to_dict())
+
+    except HTTPException as e:
+        await abandon(batch, e.detail)
+        raise
+    except Exception as e:
+        await abandon(batch, str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/upload/jobs/{job_id}", response_model=UploadJobStatus)
+async def get_upload_job(job_id: str):
+    """Report progress of a background ingest job"""
+    status = get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return UploadJobStatus(**status)
@@ -0,0 +1,210 @@
+"""
+Cross-worker coordination for multi-worker serving
+
+Each worker keeps its own BM25 index, usage aggregates and result cache. Writers
+append events to a shared SQLite log; every worker tails the log and applies
+events from the others, so derived state converges within SYNC_INTERVAL.
+With a single worker the event log and process locks are no-ops.
+"""
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from .config import WORKERS, SYNC_DB_PATH, SYNC_INTERVAL, SYNC_EVENT_RETENTION
+
+ENABLED = WORKERS > 1
+ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_lock = threading.Lock()
+_db: Optional[sqlite3.Connection] = None
+_last_seq = 0
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+_server_lock = None
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(os.path.abspath(SYNC_DB_PATH)), exist_ok=True)
+        _db = sqlite3.connect(SYNC_DB_PATH, check_same_thread=False, timeout=30)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.executescript(_SCHEMA)
+    return _db
+
+@contextmanager
+def process_lock(name: str) -> Iterator[None]:
+    """Serialize a critical section across worker processes on this host"""
+    if not ENABLED:
+        yield
+        return
+    path = f"{SYNC_DB_PATH}.{name}.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _server_lock_path() -> str:
+    path = f"{SYNC_DB_PATH}.server.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
+
+def hold_server_lock():
+    """Mark this process as a running API server until it exits; workers share the lock"""
+    global _server_lock
+    if _server_lock is None:
+        _server_lock = open(_server_lock_path(), "w")
+        fcntl.flock(_server_lock, fcntl.LOCK_SH)
+
+def server_running() -> bool:
+    """Whether an API server on this host is running against the same data directory"""
+    with open(_server_lock_path(), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return False
+
+def _publish(kind: str, payload: Any):
+    with _lock:
+        db = _connect()
+        db.execute(
+            "INSERT INTO events (origin, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+            (ORIGIN, kind, json.dumps(payload), time.time())
+        )
+        db.commit()
+
+def publish_chunks(ids: List[str]):
+    """Announce written chunks so other workers re-index them"""
+    if ENABLED and ids:
+        _publish("chunks", ids)
+
+def publish_usage(deltas: List[Tuple[str, Optional[str], int]]):
+    """Announce per-document usage changes as (source_doc_id, journal, delta)"""
+    if ENABLED and deltas:
+        _publish("usage", deltas)
+
+def publish_job(status: Dict[str, Any]):
+    """Share an ingest job's progress so any worker can answer status requests"""
+    if not ENABLED:
+        return
+    with _lock:
+        db = _connect()
+        db.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)",
+            (status["job_id"], json.dumps(status), time.time())
+        )
+        db.commit()
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    if not ENABLED:
+        return None
+    with _lock:
+        row = _connect().execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def mark():
+    """Skip events older than now; call before building derived indexes from the store"""
+    global _last_seq
+    if not ENABLED:
+        return
+    with _lock:
+        _last_seq = _connect().execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+def _apply(kind: str, payloads: List[Any]):
+    from . import aggregates, bm25, quantized
+    from .database import get_collection
+
+    if kind == "chunks":
+        ids = list(dict.fromkeys(chunk_id for payload in payloads for chunk_id in payload))
+        stored = get_collection().get(ids=ids, include=["documents"])
+        bm25.add(stored['ids'], stored['documents'])
+        quantized.invalidate()
+    elif kind == "usage":
+        aggregates.apply_deltas([tuple(delta) for payload in payloads for delta in payload])
+
+def poll() -> int:
+    """Apply events published by other workers since the last poll, returning how many"""
+    global _last_seq
+    if not ENABLED:
+        return 0
+    with _lock:
+        rows = _connect().execute(
+            "SELECT seq, origin, kind, payload FROM events WHERE seq > ? ORDER BY seq",
+            (_last_seq,)
+        ).fetchall()
+    if not rows:
+        return 0
+
+    by_kind: Dict[str, List[Any]] = {}
+    for seq, origin, kind, payload in rows:
+        if origin != ORIGIN:
+            by_kind.setdefault(kind, []).append(json.loads(payload))
+    for kind, payloads in by_kind.items():
+        _apply(kind, payloads)
+    _last_seq = rows[-1][0]
+
+    if by_kind:
+        from .database import bump_generation
+        bump_generation()
+    return len(rows)
+
+def _prune():
+    with _lock:
+        db = _connect()
+        cutoff = time.time() - SYNC_EVENT_RETENTION
+        db.execute("DELETE FROM events WHERE created_at < ?", (cutoff,))
+        db.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,))
+        db.commit()
+
+def publish_pending():
+    """Publish usage changes batched up since the last tick"""
+    from . import aggregates
+    publish_usage(aggregates.drain_outbox())
+
+def _run():
+    last_prune = 0.0
+    while not _stop.wait(SYNC_INTERVAL):
+        try:
+            publish_pending()
+            poll()
+            if time.time() - last_prune > 60:
+                _prune()
+                last_prune = time.time()
+        except Exception as e:
+            print(f"Worker sync failed, retrying: {e}")
+
+def start():
+    """Tail the shared event log in the background"""
+    global _thread
+    if ENABLED and _thread is None:
+        _thread = threading.Thread(target=_run, name="worker-sync", daemon=True)
+        _thread.start()
+
+def stop():
+    _stop.set()
+    if _thread is not None:
+        publish_pending()
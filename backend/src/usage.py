@@ -0,0 +1,89 @@
+"""
+Write-behind usage counters: increments are kept in memory and flushed to ChromaDB in batches
+"""
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional
+from .config import USAGE_FLUSH_INTERVAL
+from .database import get_collection
+from .embeddings import get_provider, DEFAULT_EMBEDDING_MODEL
+from . import aggregates, sync
+from .metrics import stage
+
+# Pending increments per embedding model, since each model has its own collection
+_pending: Dict[str, Counter] = {}
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_stop = threading.Event()
+_flusher = None
+
+def record_hits(chunk_ids: List[str], metadatas: List[Dict[str, Any]], model: Optional[str] = None):
+    """Count one usage for each chunk of a model's collection without touching storage"""
+    _ensure_flusher()
+    model = get_provider(model).name
+    with _pending_lock:
+        _pending.setdefault(model, Counter()).update(chunk_ids)
+    # The aggregates mirror the default model's collection, which is what they are rebuilt from
+    if model == DEFAULT_EMBEDDING_MODEL:
+        aggregates.record_usage(metadatas)
+
+def pending_counts() -> Dict[str, int]:
+    """Increments recorded but not yet flushed, summed over models"""
+    with _pending_lock:
+        totals: Counter = Counter()
+        for counts in _pending.values():
+            totals.update(counts)
+        return dict(totals)
+
+def flush() -> int:
+    """Write all pending increments with one get and one update per model, returning chunks updated"""
+    global _pending
+    with _flush_lock:
+        with _pending_lock:
+            if not _pending:
+                return 0
+            batches, _pending = _pending, {}
+
+        updated = 0
+        for model, batch in batches.items():
+            try:
+                updated += _flush_model(model, batch)
+            except Exception as e:
+                print(f"Usage flush for {model} failed, retrying later: {e}")
+                with _pending_lock:
+                    _pending.setdefault(model, Counter()).update(batch)
+        return updated
+
+def _flush_model(model: str, batch: Counter) -> int:
+    # Workers must not interleave the read-modify-write of usage_count
+    with stage("usage_flush"), sync.process_lock("usage"):
+        collection = get_collection(model)
+        stored = collection.get(ids=list(batch), include=["metadatas"])
+        ids = stored['ids']
+        # Only usage_count is written: Chroma merges metadata keys, so an ingest
+        # update landing between this get and update keeps its other fields
+        metadatas = [
+            {'usage_count': metadata.get('usage_count', 0) + batch[chunk_id]}
+            for chunk_id, metadata in zip(ids, stored['metadatas'])
+        ]
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+    return len(ids)
+
+def _run_flusher():
+    while not _stop.wait(USAGE_FLUSH_INTERVAL):
+        flush()
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flush_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run_flusher, name="usage-flusher", daemon=True)
+            _flusher.start()
+
+def stop():
+    """Stop the background flusher and write out remaining increments"""
+    _stop.set()
+    flush()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Load-testing benchmark for the Research Assistant API
+
+  generate  scale data/sample_chunks.json into a synthetic NDJSON corpus
+  run       load the corpus, then drive concurrent upload/search/journal/stats
+            traffic and write latency percentiles and throughput as JSON
+  compare   print the percentile changes between two result files
+
+Runs fully offline: start the backend without OPENAI_API_KEY so the local
+sentence-transformers model is used.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+backend_env = Path(__file__).parent.parent / "backend" / ".env"
+load_dotenv(backend_env)
+
+DEFAULT_BASE_URL = f"http://localhost:{os.getenv('PORT', 8000)}"
+SAMPLE_FILE = Path(__file__).parent.parent / "data" / "sample_chunks.json"
+DEFAULT_MIX = "search=70,upload=10,journal=15,stats=5"
+
+JOURNALS = [
+    "ILRI extension brief", "arXiv preprint", "Field Crops Research",
+    "Agricultural Systems", "Nature Plants", "Journal of Machine Learning Research",
+]
+
+
+def load_samples():
+    with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def synthetic_chunks(count, seed=0, prefix="bench"):
+    """Yield sample-shaped chunks whose text is recombined from sample sentences"""
+    rng = random.Random(seed)
+    samples = load_samples()
+    sentences = [
+        sentence.strip() + "."
+        for chunk in samples for sentence in chunk["text"].split(".") if len(sentence.split()) > 3
+    ]
+    attributes = sorted({attribute for chunk in samples for attribute in chunk["attributes"]})
+    headings = sorted({chunk["section_heading"] for chunk in samples})
+
+    chunks_per_doc = 12
+    for i in range(count):
+        doc = i // chunks_per_doc
+        yield {
+            "id": f"{prefix}_{doc:07d}_{i % chunks_per_doc:02d}",
+            "source_doc_id": f"{prefix}_doc_{doc:07d}.pdf",
+            "chunk_index": i % chunks_per_doc,
+            "section_heading": rng.choice(headings),
+            "doi": f"10.5555/{prefix}.{doc}",
+            "journal": JOURNALS[doc % len(JOURNALS)],
+            "publish_year": 1995 + doc % 30,
+            "usage_count": rng.randint(0, 50),
+            "attributes": rng.sample(attributes, rng.randint(1, 4)),
+            "link": f"https://example.org/{prefix}/{doc}",
+            "text": " ".join(rng.choice(sentences) for _ in range(rng.randint(3, 8))),
+        }
+
+
+def generate(args):
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    start = time.time()
+    with open(out, "w", encoding="utf-8") as f:
+        for chunk in synthetic_chunks(args.chunks, args.seed):
+            f.write(json.dumps(chunk) + "\n")
+    print(f"✅ Wrote {args.chunks} chunks to {out} in {time.time() - start:.1f}s")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, errors, rejected, elapsed):
+    values = sorted(latencies)
+    return {
+        "requests": len(values) + errors + rejected,
+        "errors": errors,
+        "rejected": rejected,
+        "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(values) / len(values) if values else None,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else None,
+    }
+
+
+def load_corpus(base_url, corpus, batch_size):
+    """Stream the corpus to /api/upload/stream and report ingest throughput"""
+    with open(corpus, "rb") as f:
+        start = time.time()
+        response = requests.put(
+            f"{base_url}/api/upload/stream",
+            data=iter(lambda: f.read(1024 * 1024), b""),
+            params={"batch_size": batch_size},
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    elapsed = time.time() - start
+    response.raise_for_status()
+    job = response.json()
+    print(
+        f"📤 Loaded {job['chunks_written']} chunks ({job['skipped']} unchanged) "
+        f"in {elapsed:.1f}s, {job['chunks_per_second']:.1f} chunks/s"
+    )
+    return {**job, "wall_seconds": elapsed}
+
+
+class Traffic:
+    """Request generators for each kind of traffic, sharing corpus-derived inputs"""
+
+    def __init__(self, base_url, corpus_size, seed, upload_batch, repeat_queries=False):
+        self.base_url = base_url
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.corpus_size = max(corpus_size, 1)
+        self.upload_batch = upload_batch
+        self.upload_counter = 0
+        # Upload ids differ between runs, so a rerun inserts chunks instead of skipping them as unchanged
+        self.run_id = int(time.time())
+        self.repeat_queries = repeat_queries
+        samples = load_samples()
+        self.headings = [chunk["section_heading"] for chunk in samples]
+        self.attributes = sorted({a for chunk in samples for a in chunk["attributes"]})
+        self.words = sorted({
+            word.strip(".,;:()").lower()
+            for chunk in samples for word in chunk["text"].split() if len(word) > 4 and word.isalpha()
+        })
+
+    def _pick(self, fn):
+        with self.lock:
+            return fn(self.rng)
+
+    def _query(self, rng):
+        query = f"{rng.choice(self.headings)} {rng.choice(self.attributes)}"
+        if not self.repeat_queries:
+            # A few random corpus words make nearly every query new, so the embedding
+            # and result caches do not answer for the model and the index
+            query += " " + " ".join(rng.sample(self.words, 3))
+        return query.lower()
+
+    def search(self, session):
+        query = self._pick(self._query)
+        return session.post(f"{self.base_url}/api/similarity_search", json={"query": query, "k": 10, "min_score": 0.1})
+
+    def journal(self, session):
+        doc = self._pick(lambda rng: rng.randrange(self.corpus_size) // 12)
+        return session.get(f"{self.base_url}/api/bench_doc_{doc:07d}.pdf", params={"limit": 50})
+
+    def stats(self, session):
+        return session.get(f"{self.base_url}/api/stats")
+
+    def upload(self, session):
+        with self.lock:
+            self.upload_counter += 1
+            seed = self.upload_counter
+        chunks = synthetic_chunks(self.upload_batch, seed=seed, prefix=f"live{self.run_id}_{seed}")
+        # The streaming endpoint answers once the chunks are embedded and stored,
+        # so the latency covers the whole ingest rather than queueing a job
+        return session.put(
+            f"{self.base_url}/api/upload/stream",
+            data="".join(json.dumps(chunk) + "\n" for chunk in chunks).encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        kind, weight = part.split("=")
+        weights[kind.strip()] = float(weight)
+    return weights
+
+
+def drive(traffic, weights, clients, duration):
+    """Run `clients` closed-loop clients for `duration` seconds"""
+    kinds = list(weights)
+    latencies = {kind: [] for kind in kinds}
+    errors = {kind: 0 for kind in kinds}
+    # 503s are backpressure working as intended, so they are reported apart from errors
+    rejected = {kind: 0 for kind in kinds}
+    record_lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client(index):
+        rng = random.Random(index)
+        session = requests.Session()
+        while time.time() < deadline:
+            kind = rng.choices(kinds, weights=[weights[k] for k in kinds])[0]
+            start = time.perf_counter()
+            status = None
+            try:
+                response = getattr(traffic, kind)(session)
+                status = response.status_code
+                # A stream upload answers 200 even when some of its records failed
+                if status == 200 and kind == "upload" and response.json().get("failures"):
+                    status = 500
+            except requests.RequestException:
+                pass
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with record_lock:
+                if status is not None and status < 400:
+                    latencies[kind].append(elapsed_ms)
+                elif status == 503:
+                    rejected[kind] += 1
+                else:
+                    errors[kind] += 1
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.time() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "elapsed_seconds": elapsed,
+        "overall": summarize(all_latencies, sum(errors.values()), sum(rejected.values()), elapsed),
+        "by_kind": {kind: summarize(latencies[kind], errors[kind], rejected[kind], elapsed) for kind in kinds},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    base_url = args.base_url
+    ready = requests.get(f"{base_url}/health/ready")
+    if ready.status_code != 200:
+        print(f"❌ API is not ready: {ready.text}")
+        return False
+
+    corpus_size = args.corpus_size
+    ingest = None
+    if args.corpus:
+        if not args.skip_load:
+            ingest = load_corpus(base_url, args.corpus, args.batch_size)
+        with open(args.corpus, "rb") as f:
+            corpus_size = sum(1 for _ in f)
+
+    traffic = Traffic(base_url, corpus_size, args.seed, args.upload_batch, args.repeat_queries)
+    weights = parse_mix(args.mix)
+    print(f"⚡ {args.clients} clients for {args.duration}s, mix {weights}")
+    results = drive(traffic, weights, args.clients, args.duration)
+
+    server_stats = requests.get(f"{base_url}/api/stats").json()
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "config": {
+            "clients": args.clients,
+            "duration": args.duration,
+            "mix": weights,
+            "corpus_size": corpus_size,
+            "upload_batch": args.upload_batch,
+            "repeat_queries": args.repeat_queries,
+            "embedding_model": (server_stats.get("embedding_stats") or {}).get("default_model"),
+        },
+        "startup": ready.json(),
+        "ingest": ingest,
+        "total_chunks": server_stats.get("total_chunks"),
+        **results,
+    }
+
+    for kind, summary in results["by_kind"].items():
+        if summary["p50_ms"] is None:
+            print(f"  {kind:8} no successful requests ({summary['errors']} errors, {summary['rejected']} rejected)")
+            continue
+        print(
+            f"  {kind:8} {summary['throughput_rps']:7.1f} req/s  p50 {summary['p50_ms']:7.1f}ms  "
+            f"p95 {summary['p95_ms']:7.1f}ms  p99 {summary['p99_ms']:7.1f}ms  "
+            f"errors {summary['errors']}  rejected {summary['rejected']}"
+        )
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {out}")
+    return True
+
+
+def compare(args):
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    for kind in ["overall"] + sorted(candidate["by_kind"]):
+        old = baseline["overall"] if kind == "overall" else baseline["by_kind"].get(kind)
+        new = candidate["overall"] if kind == "overall" else candidate["by_kind"][kind]
+        if not old:
+            continue
+        changes = []
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if old[metric] and new[metric] is not None:
+                changes.append(f"{metric} {old[metric]:.1f} → {new[metric]:.1f} ({(new[metric] / old[metric] - 1) * 100:+.0f}%)")
+        print(f"{kind:8} " + "  ".join(changes))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Research Assistant API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Write a synthetic NDJSON corpus")
+    gen.add_argument("--chunks", type=int, default=10000, help="Number of chunks (10^4 to 10^6)")
+    gen.add_argument("--out", default="../data/bench_chunks.ndjson")
+    gen.add_argument("--seed", type=int, default=0)
+
+    bench = commands.add_parser("run", help="Drive concurrent traffic and record latencies")
+    bench.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    bench.add_argument("--corpus", help="NDJSON corpus from `generate`, uploaded before the run")
+    bench.add_argument("--skip-load", action="store_true", help="Corpus is already loaded")
+    bench.add_argument("--corpus-size", type=int, default=10000, help="Used for journal lookups without --corpus")
+    bench.add_argument("--batch-size", type=int, default=256, help="Batch size for the corpus load")
+    bench.add_argument("--clients", type=int, default=16)
+    bench.add_argument("--duration", type=float, default=30.0, help="Seconds of mixed traffic")
+    bench.add_argument("--mix", default=DEFAULT_MIX, help="Relative weights of search/upload/journal/stats")
+    bench.add_argument("--upload-batch", type=int, default=20, help="Chunks per upload request")
+    bench.add_argument(
+        "--repeat-queries", action="store_true",
+        help="Draw searches from a small fixed set, so repeats are served from the caches"
+    )
+    bench.add_argument("--seed", type=int, default=0)
+    bench.add_argument("--out", default="../data/bench_results.json")
+
+    cmp = commands.add_parser("compare", help="Compare two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("candidate")
+
+    args = parser.parse_args()
+    handlers = {"generate": generate, "run": run, "compare": compare}
+    sys.exit(0 if handlers[args.command](args) is not False else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,19 @@
 Load sample data from data/sample_chunks.json to the research assistant API
 """
 
+import argparse
 import requests
 import json
 import sys
 import os
+import time
 from pathlib import Path
 
 backend_src = Path(__file__).parent.parent / "backend" / "src"
 sys.path.insert(0, str(backend_src))
 
 from dotenv import load_dotenv
+from json_stream import iter_json_array
 
 backend_env = Path(__file__).parent.parent / "backend" / ".env"
 load_dotenv(backend_env)
@@ -50,7 +53,8 @@ def load_from_json_file(filename="../data/sample_chunks.json", base_url=None):
         if response.status_code == 202:
             print("✅ Successfully uploaded data from JSON file!")
             print(f"Response: {response.json()}")
-            return True
+            job_id = response.json().get("job_id")
+            return wait_for_job(job_id, base_url) if job_id else True
         else:
             print(f"❌ Upload failed with status {response.status_code}")
             print(f"Response: {response.text}")
@@ -68,6 +72,90 @@ def load_from_json_file(filename="../data/sample_chunks.json", base_url=None):
         return False
 
 
+def iter_ndjson_lines(data_file):
+    """Yield one NDJSON line per chunk from a .ndjson/.jsonl or JSON array file"""
+    with open(data_file, "r", encoding="utf-8") as f:
+        if data_file.suffix in (".ndjson", ".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield line.rstrip("\n").encode("utf-8") + b"\n"
+        else:
+            for chunk in iter_json_array(f):
+                yield json.dumps(chunk).encode("utf-8") + b"\n"
+
+
+def stream_from_file(filename="../data/sample_chunks.json", base_url=None, batch_size=None):
+    """Stream chunks to the NDJSON upload endpoint without holding the file in memory"""
+
+    data_file = Path(__file__).parent / filename
+
+    if base_url is None:
+        port = os.getenv("PORT", 8000)
+        base_url = f"http://localhost:{port}"
+
+    if not data_file.exists():
+        print(f"❌ File {data_file} not found!")
+        return False
+
+    params = {"batch_size": batch_size} if batch_size else {}
+
+    try:
+        response = requests.put(
+            f"{base_url}/api/upload/stream",
+            data=iter_ndjson_lines(data_file),
+            params=params,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        if response.status_code == 200:
+            job = response.json()
+            print(
+                f"✅ Streamed {job['total_chunks']} chunks: {job['inserted']} inserted, "
+                f"{job['updated']} updated, {job['skipped']} unchanged "
+                f"({job['failures']} failed, {job['chunks_per_second']:.1f} chunks/s)"
+            )
+            for error in job["errors"]:
+                print(f"   ⚠️  {error}")
+            return job["failures"] == 0
+        else:
+            print(f"❌ Streaming upload failed with status {response.status_code}")
+            print(f"Response: {response.text}")
+            return False
+
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid JSON format: {e}")
+        return False
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to API.")
+        print(f"   Expected API URL: {base_url}")
+        return False
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return False
+
+
+def wait_for_job(job_id, base_url, poll_interval=1.0, timeout=3600):
+    """Poll an ingest job until it finishes"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = requests.get(f"{base_url}/api/upload/jobs/{job_id}")
+        if response.status_code != 200:
+            print(f"❌ Could not read job {job_id}: {response.status_code}")
+            return False
+
+        job = response.json()
+        print(
+            f"  ⏳ {job['status']}: {job['inserted']} inserted, {job['updated']} updated, "
+            f"{job['skipped']} unchanged, {job['failures']} failed ({job['chunks_per_second']:.1f} chunks/s)"
+        )
+        if job["status"] in ("completed", "failed"):
+            return job["status"] == "completed" and job["failures"] == 0
+        time.sleep(poll_interval)
+
+    print(f"❌ Timed out waiting for job {job_id}")
+    return False
+
+
 def verify_upload(base_url=None):
     """Verify the data was uploaded correctly"""
     if base_url is None:
@@ -105,6 +193,12 @@ def verify_upload(base_url=None):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load chunks into the Research Assistant API")
+    parser.add_argument("file", nargs="?", default="../data/sample_chunks.json")
+    parser.add_argument("--stream", action="store_true", help="stream records as NDJSON")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
     print("🚀 Research Assistant JSON Data Loader")
     print("=" * 50)
 
@@ -118,7 +212,12 @@ if __name__ == "__main__":
         print("❌ API server not accessible")
         sys.exit(1)
 
-    if load_from_json_file():
+    if args.stream:
+        loaded = stream_from_file(args.file, batch_size=args.batch_size)
+    else:
+        loaded = load_from_json_file(args.file)
+
+    if loaded:
         verify_upload()
 
         print("\n✅ Setup complete!")
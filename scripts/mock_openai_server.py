@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI embeddings server for exercising the async embedding client offline
+
+Run it, then start the backend with OPENAI_BASE_URL=http://localhost:8100/v1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+parser = argparse.ArgumentParser(description="Serve deterministic fake embeddings")
+parser.add_argument("--port", type=int, default=8100)
+parser.add_argument(
+    "--dimensions", type=int, default=1536,
+    help="Vector size; for other than 1536, give the backend an unknown OPENAI_EMBEDDING_MODEL and matching OPENAI_EMBEDDING_DIMENSIONS"
+)
+parser.add_argument("--latency-ms", type=float, default=50, help="Delay added to every request")
+parser.add_argument("--rpm", type=int, default=0, help="Requests per minute before answering 429 (0 = unlimited)")
+parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+args = parser.parse_args()
+
+app = FastAPI()
+stats = {"requests": 0, "inputs": 0, "rate_limited": 0, "errors": 0, "max_in_flight": 0}
+in_flight = 0
+window_start = time.monotonic()
+window_count = 0
+
+def fake_embedding(text: str) -> list:
+    """Unit vector seeded by the text, so equal inputs give equal embeddings"""
+    rng = random.Random(hashlib.sha1(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(args.dimensions)]
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    global in_flight, window_start, window_count
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+
+    now = time.monotonic()
+    if now - window_start >= 60:
+        window_start, window_count = now, 0
+    window_count += 1
+    if args.rpm and window_count > args.rpm:
+        stats["rate_limited"] += 1
+        retry_after = max(0.1, 60 - (now - window_start))
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests"}},
+            status_code=429,
+            headers={"retry-after": f"{retry_after:.2f}"}
+        )
+    if random.random() < args.error_rate:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Injected failure", "type": "server_error"}}, status_code=500)
+
+    in_flight += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], in_flight)
+    try:
+        await asyncio.sleep(args.latency_ms / 1000)
+    finally:
+        in_flight -= 1
+
+    stats["requests"] += 1
+    stats["inputs"] += len(inputs)
+    return {
+        "object": "list",
+        "model": body.get("model", "mock"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0}
+    }
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -5,8 +5,8 @@ Comprehensive API testing script for the Research Assistant
 
 import requests
 import json
-import time
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,6 +28,63 @@ def test_api_health():
         print(f"❌ Cannot connect to API: {e}")
         return False
 
+STREAM_DOC_ID = "test_stream_document.pdf"
+
+def make_chunk(chunk_id, source_doc_id, chunk_index, text):
+    """A ChunkData record for the test document"""
+    return {
+        "id": chunk_id,
+        "source_doc_id": source_doc_id,
+        "chunk_index": chunk_index,
+        "section_heading": "Test Section",
+        "doi": None,
+        "journal": "Test Journal",
+        "publish_year": 2023,
+        "usage_count": 0,
+        "attributes": ["Testing"],
+        "link": "https://example.com/test",
+        "text": text
+    }
+
+def wait_for_job(job_id, timeout=120):
+    """Poll an ingest job until it finishes, returning its final status"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = requests.get(f"{BASE_URL}/api/upload/jobs/{job_id}")
+        if response.status_code != 200:
+            print(f"❌ Job status failed: {response.status_code}")
+            return None
+        job = response.json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.5)
+    print(f"❌ Job {job_id} still running after {timeout}s")
+    return None
+
+def test_health_probes():
+    """Test liveness and wait for readiness"""
+    print("\n💓 Testing health probes...")
+    try:
+        response = requests.get(f"{BASE_URL}/health/live")
+        if response.status_code != 200:
+            print(f"❌ Liveness failed: {response.status_code} {response.text}")
+            return False
+        print("✅ Process is live")
+
+        deadline = time.time() + 120
+        while True:
+            response = requests.get(f"{BASE_URL}/health/ready")
+            if response.status_code == 200:
+                print(f"✅ Ready after {response.json()['startup_seconds']:.2f}s of startup")
+                return True
+            if time.time() > deadline:
+                print(f"❌ Not ready: {response.status_code} {response.text}")
+                return False
+            time.sleep(1)
+    except Exception as e:
+        print(f"❌ Health probe error: {e}")
+        return False
+
 def test_upload():
     """Test the upload endpoint"""
     print("\n📤 Testing upload endpoint...")
@@ -59,8 +116,13 @@ def test_upload():
         )
         
         if response.status_code == 202:
-            print("✅ Upload successful")
-            print(f"Response: {response.json()}")
+            print(f"✅ Upload accepted: {response.json()}")
+            # Uploads are ingested in the background; searches only see them once the job ends
+            job = wait_for_job(response.json()["job_id"])
+            if job is None or job["status"] != "completed":
+                print(f"❌ Upload job did not complete: {job}")
+                return False
+            print(f"✅ Upload job completed: {job['chunks_written']} written, {job['skipped']} unchanged")
             return True
         else:
             print(f"❌ Upload failed: {response.status_code}")
@@ -151,6 +213,147 @@ def test_get_journal():
         except Exception as e:
             print(f"    ❌ Retrieval error: {e}")
 
+def test_stream_upload():
+    """Test NDJSON streaming upload"""
+    print("\n📤 Testing streaming upload...")
+
+    # Two chunks share a chunk_index so pagination has to break the tie by id
+    chunks = [
+        make_chunk("test_stream_001", STREAM_DOC_ID, 0, "Streaming upload test about soil nitrogen in maize fields."),
+        make_chunk("test_stream_002", STREAM_DOC_ID, 1, "Streaming upload test about cover crops and erosion."),
+        make_chunk("test_stream_003", STREAM_DOC_ID, 1, "Streaming upload test about velvet bean as green manure.")
+    ]
+    body = "\n".join(json.dumps(chunk) for chunk in chunks) + "\n"
+
+    try:
+        response = requests.put(
+            f"{BASE_URL}/api/upload/stream",
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        if response.status_code != 200:
+            print(f"❌ Stream upload failed: {response.status_code}")
+            print(f"Response: {response.text}")
+            return False
+        job = response.json()
+        stored = job["chunks_written"] + job["skipped"]
+        if job["status"] != "completed" or stored != len(chunks):
+            print(f"❌ Stream upload stored {stored}/{len(chunks)} chunks: {job}")
+            return False
+        print(f"✅ Stream upload stored {stored} chunks ({job['failures']} failures)")
+        return True
+    except Exception as e:
+        print(f"❌ Stream upload error: {e}")
+        return False
+
+def test_batch_search():
+    """Test the multi-query search endpoint"""
+    print("\n🔍 Testing batch similarity search...")
+
+    payload = {
+        "queries": [
+            {"query": "velvet bean cultivation practices", "k": 3, "min_score": 0.0},
+            {"query": "soil nitrogen in maize", "k": 2, "min_score": 0.0}
+        ]
+    }
+    try:
+        response = requests.post(f"{BASE_URL}/api/similarity_search/batch", json=payload)
+        if response.status_code != 200:
+            print(f"❌ Batch search failed: {response.status_code}")
+            print(f"Response: {response.text}")
+            return False
+        results = response.json()["results"]
+        if len(results) != len(payload["queries"]):
+            print(f"❌ Expected {len(payload['queries'])} result sets, got {len(results)}")
+            return False
+        for request, result in zip(payload["queries"], results):
+            found = len(result["results"])
+            if found > request["k"]:
+                print(f"❌ '{request['query']}' returned {found} results for k={request['k']}")
+                return False
+            print(f"  ✅ '{request['query']}': {found} results")
+        return True
+    except Exception as e:
+        print(f"❌ Batch search error: {e}")
+        return False
+
+def test_paginated_journal():
+    """Test cursor pagination and streaming of GET /api/{journal_id}"""
+    print("\n📖 Testing paginated journal retrieval...")
+
+    try:
+        ids, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 2, "include_text": "false"}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/api/{STREAM_DOC_ID}", params=params)
+            if response.status_code != 200:
+                print(f"❌ Page {pages + 1} failed: {response.status_code} {response.text}")
+                return False
+            page = response.json()
+            pages += 1
+            ids += [chunk["id"] for chunk in page["chunks"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        if len(ids) != len(set(ids)) or len(ids) != page["total_chunks"]:
+            print(f"❌ Pages returned {ids} for {page['total_chunks']} chunks")
+            return False
+        print(f"✅ {len(ids)} chunks over {pages} pages")
+
+        response = requests.get(f"{BASE_URL}/api/{STREAM_DOC_ID}", params={"stream": "true"})
+        if response.status_code != 200:
+            print(f"❌ Streamed retrieval failed: {response.status_code}")
+            return False
+        streamed = response.json()
+        if [chunk["id"] for chunk in streamed["chunks"]] != ids:
+            print(f"❌ Streamed chunks differ from paginated ones: {streamed}")
+            return False
+        print(f"✅ Streamed {streamed['total_chunks']} chunks")
+        return True
+    except Exception as e:
+        print(f"❌ Paginated retrieval error: {e}")
+        return False
+
+def test_index_documents():
+    """Test the document listing from the secondary index"""
+    print("\n🗂️  Testing document index...")
+
+    try:
+        response = requests.get(f"{BASE_URL}/api/index/documents", params={"journal": "Test Journal"})
+        if response.status_code != 200:
+            print(f"❌ Document listing failed: {response.status_code}")
+            return False
+        documents = {doc["source_doc_id"]: doc for doc in response.json()}
+        if STREAM_DOC_ID not in documents:
+            print(f"❌ {STREAM_DOC_ID} missing from {list(documents)}")
+            return False
+        print(f"✅ {len(documents)} documents in Test Journal, {STREAM_DOC_ID} has {documents[STREAM_DOC_ID]['chunk_count']} chunks")
+        return True
+    except Exception as e:
+        print(f"❌ Document listing error: {e}")
+        return False
+
+def test_metrics():
+    """Test the Prometheus metrics endpoint"""
+    print("\n📈 Testing metrics endpoint...")
+
+    try:
+        response = requests.get(f"{BASE_URL}/metrics")
+        if response.status_code != 200:
+            print(f"❌ Metrics failed: {response.status_code}")
+            return False
+        names = {line.split()[2] for line in response.text.splitlines() if line.startswith("# TYPE")}
+        if "research_assistant_embedding_encode_calls_total" not in names:
+            print(f"❌ Expected metrics missing, found: {sorted(names)}")
+            return False
+        print(f"✅ {len(names)} metrics exported")
+        return True
+    except Exception as e:
+        print(f"❌ Metrics error: {e}")
+        return False
+
 def test_stats():
     """Test statistics endpoint"""
     print("\n📊 Testing statistics endpoint...")
@@ -178,36 +381,19 @@ def test_stats():
         print(f"❌ Stats error: {e}")
 
 def run_performance_test():
-    """Basic performance testing"""
+    """Short concurrent search load; use benchmark.py for full runs"""
     print("\n⚡ Running performance tests...")
-    
-    search_times = []
-    
-    for i in range(5):
-        start_time = time.time()
-        
-        try:
-            response = requests.post(
-                f"{BASE_URL}/api/similarity_search",
-                json={"query": f"test query {i}", "k": 5, "min_score": 0.1},
-                headers={"Content-Type": "application/json"}
-            )
-            
-            end_time = time.time()
-            search_time = end_time - start_time
-            search_times.append(search_time)
-            
-            if response.status_code == 200:
-                print(f"  🔍 Search {i+1}: {search_time:.3f}s")
-            else:
-                print(f"  ❌ Search {i+1} failed")
-        except Exception as e:
-            print(f"  ❌ Search {i+1} error: {e}")
-    
-    if search_times:
-        avg_time = sum(search_times) / len(search_times)
-        print(f"\n📊 Average search time: {avg_time:.3f}s")
-        print(f"📊 Min/Max: {min(search_times):.3f}s / {max(search_times):.3f}s")
+
+    from benchmark import Traffic, drive
+
+    traffic = Traffic(BASE_URL, corpus_size=1, seed=0, upload_batch=1)
+    results = drive(traffic, {"search": 1}, clients=4, duration=5)
+    summary = results["by_kind"]["search"]
+    if summary["p50_ms"] is None:
+        print(f"  ❌ All {summary['errors']} searches failed")
+        return
+    print(f"📊 {summary['requests']} searches, {summary['throughput_rps']:.1f} req/s, {summary['errors']} errors")
+    print(f"📊 p50/p95/p99: {summary['p50_ms']:.1f} / {summary['p95_ms']:.1f} / {summary['p99_ms']:.1f} ms")
 
 def main():
     """Run comprehensive API tests"""
@@ -216,10 +402,16 @@ def main():
     
     tests = [
         ("API Health", test_api_health),
+        ("Health Probes", test_health_probes),
         ("Upload", test_upload),
+        ("Stream Upload", test_stream_upload),
         ("Similarity Search", test_similarity_search),
+        ("Batch Search", test_batch_search),
         ("Journal Retrieval", test_get_journal),
+        ("Paginated Journal", test_paginated_journal),
+        ("Document Index", test_index_documents),
         ("Statistics", test_stats),
+        ("Metrics", test_metrics),
         ("Performance", run_performance_test)
     ]
     